@@ -1,10 +1,323 @@
+import math
 import streamlit as st
 import pandas as pd
 from database.models import init_db
-from database.operations import DatabaseOperations
+from database.operations import DatabaseOperations, DatabaseAggregates, EXPLORER_COLUMNS
 from components.upload import handle_file_upload
 from components.visualizations import Visualizations
-from utils.data_processor import DataProcessor
+from utils.hashing import file_digest
+from utils.instrumentation import instrumented, record_spans
+from utils.jobs import ACTIVE_STATUSES, JobRunner, job_progress
+from utils.lead_metrics import LeadMetrics
+from utils.parallel import parallel_ingest
+from utils.pipeline import ingest_uploads, stream_ingest, DEFAULT_CHUNK_SIZE
+from utils.staging import StagingCache, call_key, chat_key
+
+SINGLE_UPLOAD = "Single files"
+STREAMING_UPLOAD = "Streaming (very large files)"
+MULTI_UPLOAD = "Multiple files (parallel)"
+BACKGROUND_UPLOAD = "Background job"
+
+# Raw data explorer page sizes, and how long its filter choices are cached
+EXPLORER_PAGE_SIZES = [25, 50, 100, 250]
+EXPLORER_OPTIONS_TTL_SECONDS = 300
+
+# Seconds between refreshes of the background job panel
+JOB_POLL_SECONDS = 2
+
+# Cached uploads and figures expire after an hour, and only a few distinct uploads are kept
+CACHE_TTL_SECONDS = 3600
+CACHE_MAX_ENTRIES = 8
+
+@st.cache_resource
+def get_database():
+    """Create the engine and DatabaseOperations once per server process"""
+    return DatabaseOperations(init_db())
+
+@st.cache_resource
+def get_job_runner(_db_ops):
+    """One background job runner per server process, shared by every session"""
+    return JobRunner(_db_ops)
+
+@st.cache_resource
+def get_staging_cache():
+    """Parquet copies of processed uploads that outlive the in-memory caches and restarts"""
+    return StagingCache()
+
+def upload_digest(uploaded_file):
+    """Content hash of an uploaded file, computed once per upload in this session"""
+    digests = st.session_state.setdefault('upload_digests', {})
+    if uploaded_file.file_id not in digests:
+        digests[uploaded_file.file_id] = file_digest(uploaded_file)
+    return digests[uploaded_file.file_id]
+
+def already_stored(summary):
+    """Whether any of an upload was stored before, so its processed rows don't cover the whole upload"""
+    return summary['already_ingested'] or any(summary[kind]['skipped'] > 0 for kind in ('calls', 'chats'))
+
+# Ingestion caches hold only the figures and summary; caching the processed frames
+# would deserialize a copy of the whole upload on every rerun.
+# The figures are None when part of the upload was already stored.
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner="Processing uploads...")
+@instrumented()
+def ingest_upload(call_digest, chat_digest, _call_file, _chat_file, _db_ops):
+    """Process and store an upload once per distinct pair of file contents, returning its figures and summary"""
+    processed_calls, processed_chats, summary = ingest_uploads(_call_file, _chat_file, _db_ops)
+    if processed_calls is None or processed_chats is None or already_stored(summary):
+        return None, summary
+
+    # A complete processed upload is staged so later loads of the same files skip parsing the CSVs
+    staging = get_staging_cache()
+    staging.put(call_key(call_digest, chat_digest), processed_calls)
+    staging.put(chat_key(chat_digest), processed_chats)
+    return build_frame_figures(processed_calls, processed_chats), summary
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner="Streaming uploads...")
+@instrumented()
+def stream_upload(call_digest, chat_digest, _call_file, _chat_file, _db_ops):
+    """Stream and store an upload once per distinct pair of file contents, returning its figures and summary"""
+    aggregates, summary = stream_ingest(_call_file, _chat_file, _db_ops, chunksize=DEFAULT_CHUNK_SIZE)
+    return (None if already_stored(summary) else build_aggregate_figures(aggregates)), summary
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner="Processing files in parallel...")
+@instrumented()
+def ingest_many_uploads(call_digests, chat_digests, _call_files, _chat_files, _db_ops):
+    """Process and store a multi-file upload across worker processes once per distinct set of files"""
+    return parallel_ingest(
+        [(file.name, file.getvalue()) for file in _call_files],
+        [(file.name, file.getvalue()) for file in _chat_files],
+        _db_ops
+    )
+
+def show_ingest_summary(summary):
+    if summary['already_ingested']:
+        st.info("These files were already ingested, showing the stored data for their dates.")
+    else:
+        st.success(
+            "Data processed and stored successfully! "
+            f"Calls: {summary['calls']['inserted']} new, {summary['calls']['skipped']} already stored. "
+            f"Chats: {summary['chats']['inserted']} new, {summary['chats']['skipped']} already stored."
+        )
+
+@instrumented()
+def build_aggregate_figures(aggregates):
+    """Build the dashboard figures and key metrics from pre-aggregated results"""
+    return {
+        'left': [
+            Visualizations.plot_fresh_leads_by_date(aggregates.fresh_leads_by_date()),
+            Visualizations.plot_channel_distribution(aggregates.channel_counts()),
+            Visualizations.plot_conversion_by_source(aggregates.conversion_by_source())
+        ],
+        'right': [
+            Visualizations.plot_lead_funnel(**aggregates.funnel_counts()),
+            Visualizations.plot_response_time_bins(aggregates.response_time_bins()),
+            Visualizations.plot_agent_performance(aggregates.agent_performance())
+        ],
+        'metrics': aggregates.key_metrics()
+    }
+
+# Figures built from processed frames, and the metric columns they need on top
+FRAME_FIGURES = [
+    'create_fresh_leads_by_date', 'create_channel_distribution', 'create_conversion_by_source',
+    'create_lead_funnel', 'create_response_time_distribution', 'create_agent_performance'
+]
+STAGED_CALL_COLUMNS = Visualizations.columns_for(Visualizations.CALL_COLUMNS, FRAME_FIGURES)
+STAGED_CHAT_COLUMNS = Visualizations.columns_for(Visualizations.CHAT_COLUMNS, FRAME_FIGURES)
+
+@instrumented()
+def build_frame_figures(processed_calls, processed_chats):
+    """Build the dashboard figures and key metrics from processed upload frames"""
+    metrics = LeadMetrics(processed_calls, processed_chats)
+    return {
+        'left': [
+            Visualizations.create_fresh_leads_by_date(processed_calls),
+            Visualizations.create_channel_distribution(processed_chats),
+            Visualizations.create_conversion_by_source(processed_chats, processed_calls, metrics=metrics)
+        ],
+        'right': [
+            Visualizations.create_lead_funnel(processed_calls, processed_chats, metrics=metrics),
+            Visualizations.create_response_time_distribution(processed_chats),
+            Visualizations.create_agent_performance(processed_chats)
+        ],
+        'metrics': metrics.key_metrics()
+    }
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES)
+def cached_staged_figures(upload_key, _staging):
+    """Build the figures for a staged upload, reading only the columns they use"""
+    call_digest, chat_digest = upload_key
+    return build_frame_figures(
+        _staging.get(call_key(call_digest, chat_digest), columns=STAGED_CALL_COLUMNS),
+        _staging.get(chat_key(chat_digest), columns=STAGED_CHAT_COLUMNS)
+    )
+
+@instrumented()
+def render_dashboard(figures):
+    """Render the analytics grid and key metrics"""
+    st.header("📈 Lead Pipeline Analytics")
+
+    # Layout the visualizations in a grid
+    col1, col2 = st.columns(2)
+
+    with col1:
+        for fig in figures['left']:
+            st.plotly_chart(fig)
+
+    with col2:
+        for fig in figures['right']:
+            st.plotly_chart(fig)
+
+    # Show summary metrics
+    st.header("📊 Key Metrics")
+
+    metrics = figures['metrics']
+    metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
+
+    with metric_col1:
+        st.metric("Total Leads", metrics['total_leads'])
+
+    with metric_col2:
+        st.metric("Fresh Leads", metrics['fresh_leads'])
+
+    with metric_col3:
+        st.metric("Avg Response Time (s)", f"{metrics['avg_response_time']:.2f}")
+
+    with metric_col4:
+        st.metric("Conversion Rate", f"{metrics['conversion_rate']:.1f}%")
+
+@instrumented()
+def render_stored_dashboard(db_ops, start_date=None, end_date=None):
+    """Render the dashboard from the stored records in a date range"""
+    aggregates = DatabaseAggregates(db_ops, start_date, end_date)
+    funnel = aggregates.funnel_counts()
+    if funnel['total_leads'] == 0 and funnel['contacted_leads'] == 0:
+        st.info("No stored data for the selected dates yet.")
+        return
+
+    render_dashboard(build_aggregate_figures(aggregates))
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_jobs(runner):
+    """Show recent background jobs with their progress, refreshed while the page is open"""
+    st.subheader("Background Jobs")
+    jobs = runner.db_ops.get_jobs()
+    if not jobs:
+        st.caption("No background jobs yet.")
+        return
+
+    for job in jobs:
+        progress = job_progress(job)
+        details = [f"{job['processed_rows']:,} of ~{job['total_rows']:,} rows"]
+        if progress['rows_per_second']:
+            details.append(f"{progress['rows_per_second']:,.0f} rows/s")
+        if progress['eta_seconds'] is not None:
+            details.append(f"about {progress['eta_seconds']:.0f}s left")
+
+        job_col, cancel_col = st.columns([6, 1])
+        with job_col:
+            st.progress(
+                progress['fraction'],
+                text=f"Job {job['id']} ({job['file_names']}): {job['status']}, " + ", ".join(details)
+            )
+            if job['error']:
+                st.caption(f"Error: {job['error']}")
+
+        with cancel_col:
+            if job['status'] in ACTIVE_STATUSES and not job['cancel_requested']:
+                if st.button("Cancel", key=f"cancel_job_{job['id']}"):
+                    runner.cancel(job['id'])
+                    st.rerun(scope="fragment")
+
+@st.cache_data(ttl=EXPLORER_OPTIONS_TTL_SECONDS)
+def explorer_filter_options(_db_ops):
+    """Distinct statuses, channels and employees, refreshed every few minutes"""
+    return _db_ops.get_filter_options()
+
+def render_record_page(db_ops, file_type, options, start_date, end_date):
+    """Filters, sorting and one page of stored records of one type"""
+    key = f"{file_type}_explorer"
+    is_chat = file_type == 'chat'
+
+    filter_cols = st.columns(6 if is_chat else 5)
+    with filter_cols[0]:
+        start = st.date_input("From", value=start_date, key=f"{key}_start")
+    with filter_cols[1]:
+        end = st.date_input("To", value=end_date, key=f"{key}_end")
+    with filter_cols[2]:
+        statuses = st.multiselect("Status", options[f"{file_type}_statuses"], key=f"{key}_status")
+    with filter_cols[3]:
+        channels = st.multiselect(
+            "Channel" if is_chat else "Source",
+            options['channels' if is_chat else 'call_sources'],
+            key=f"{key}_channel"
+        )
+    with filter_cols[4]:
+        phone = st.text_input("Phone starts with", key=f"{key}_phone")
+    employees = []
+    if is_chat:
+        with filter_cols[5]:
+            employees = st.multiselect("Employee", options['employees'], key=f"{key}_employee")
+
+    filters = {
+        'start': start, 'end': end, 'statuses': statuses,
+        'channels': channels, 'employees': employees, 'phone': phone.strip()
+    }
+    total = db_ops.count_records(file_type, filters)
+
+    sort_col, order_col, size_col, page_col = st.columns(4)
+    with sort_col:
+        sort = st.selectbox("Sort by", list(EXPLORER_COLUMNS[file_type]['sort']), key=f"{key}_sort")
+    with order_col:
+        descending = st.toggle("Descending", value=True, key=f"{key}_descending")
+    with size_col:
+        page_size = st.selectbox("Rows per page", EXPLORER_PAGE_SIZES, index=1, key=f"{key}_page_size")
+    with page_col:
+        pages = max(math.ceil(total / page_size), 1)
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+
+    st.dataframe(
+        db_ops.get_records_page(file_type, filters, sort, descending, page, page_size),
+        hide_index=True
+    )
+    first_row = (page - 1) * page_size + 1 if total else 0
+    st.caption(f"Rows {first_row:,}-{min(page * page_size, total):,} of {total:,}, page {page} of {pages}")
+
+def render_record_explorer(db_ops, start_date=None, end_date=None):
+    """Browse the stored records a page at a time, with filtering and sorting done in SQL"""
+    st.header("🔍 Raw Data Explorer")
+    options = explorer_filter_options(db_ops)
+    tab1, tab2 = st.tabs(["Call Data", "Chat Data"])
+
+    with tab1:
+        render_record_page(db_ops, 'call', options, start_date, end_date)
+
+    with tab2:
+        render_record_page(db_ops, 'chat', options, start_date, end_date)
+
+def render_performance(spans):
+    """Expandable table of the instrumented stages that ran in this script run"""
+    with st.expander("⏱️ Performance"):
+        if not spans:
+            st.caption("Nothing was processed in this run; the results came from cache.")
+            return
+
+        rows = pd.DataFrame(spans)
+        rows['name'] = ['\u2003' * depth + name for depth, name in zip(rows['depth'], rows['name'])]
+        st.dataframe(
+            rows.drop(columns='depth').rename(columns={
+                'name': 'Stage',
+                'seconds': 'Seconds',
+                'rows': 'Rows',
+                'rows_per_second': 'Rows/s',
+                'memory_delta_mb': 'Peak memory growth (MB)'
+            }),
+            hide_index=True
+        )
+        st.caption(
+            "Set PERF_TRACE_MEMORY=1 for exact per-stage peaks via tracemalloc, "
+            "and PERF_LOG=1 to log every stage as JSON."
+        )
 
 def main():
     st.set_page_config(
@@ -13,12 +326,16 @@ def main():
         layout="wide"
     )
 
+    with record_spans() as spans:
+        render_page()
+    render_performance(spans)
+
+def render_page():
     st.title("📊 Lead Pipeline Dashboard")
 
     # Initialize database
     try:
-        engine = init_db()
-        db_ops = DatabaseOperations(engine)
+        db_ops = get_database()
         st.success("Connected to database successfully!")
     except Exception as e:
         st.error(f"Database connection error: {str(e)}")
@@ -27,83 +344,123 @@ def main():
     # File upload section
     st.header("📁 Upload Data")
 
+    upload_mode = st.radio(
+        "Upload mode",
+        [SINGLE_UPLOAD, STREAMING_UPLOAD, MULTI_UPLOAD, BACKGROUND_UPLOAD],
+        horizontal=True,
+        help="Streaming reads, processes and stores one pair of large files in chunks so memory "
+             "stays flat. Multiple files processes several call and chat exports in parallel "
+             "worker processes. Background job queues the files and keeps ingesting them even "
+             "if this page is closed."
+    )
+    streaming = upload_mode == STREAMING_UPLOAD
+    background = upload_mode == BACKGROUND_UPLOAD
+    multiple = upload_mode in (MULTI_UPLOAD, BACKGROUND_UPLOAD)
+
     col1, col2 = st.columns(2)
 
     with col1:
         st.subheader("Call Data")
-        call_file = st.file_uploader("Upload Call CSV", type="csv", key="call_file")
+        if multiple:
+            call_files = st.file_uploader("Upload Call CSVs", type="csv", key="call_files", accept_multiple_files=True)
+        else:
+            call_file = st.file_uploader("Upload Call CSV", type="csv", key="call_file")
 
     with col2:
         st.subheader("Chat Data")
-        chat_file = st.file_uploader("Upload Chat CSV", type="csv", key="chat_file")
-
-    if call_file is not None and chat_file is not None:
-        try:
-            # Load and process data
-            df_calls = pd.read_csv(call_file)
-            df_chats = pd.read_csv(chat_file)
-
-            # Process chat data first
-            processed_chats = DataProcessor.process_chat_data(df_chats)
+        if multiple:
+            chat_files = st.file_uploader("Upload Chat CSVs", type="csv", key="chat_files", accept_multiple_files=True)
+        else:
+            chat_file = st.file_uploader("Upload Chat CSV", type="csv", key="chat_file")
 
-            # Process call data with reference to chat data for fresh lead detection
-            processed_calls = DataProcessor.process_call_data(df_calls, df_chats)
+    # Choose whether the dashboard shows the current upload or everything stored
+    history = st.radio(
+        "Show analytics for",
+        ["Current upload", "Stored history"],
+        horizontal=True
+    ) == "Stored history"
 
-            # Store in database
-            db_ops.store_call_records(processed_calls)
-            db_ops.store_chat_records(processed_chats)
+    if history:
+        date_col1, date_col2 = st.columns(2)
 
-            st.success("Data processed and stored successfully!")
+        with date_col1:
+            start_date = st.date_input("From", value=None)
 
-            # Create visualizations
-            st.header("📈 Lead Pipeline Analytics")
+        with date_col2:
+            end_date = st.date_input("To", value=None)
 
-            # Layout the visualizations in a grid
-            col1, col2 = st.columns(2)
+    # The raw data explorer opens on the dates of the upload or of the history being shown
+    explorer_dates = (start_date, end_date) if history else (None, None)
 
-            with col1:
-                st.plotly_chart(Visualizations.create_fresh_leads_by_date(processed_calls))
-                st.plotly_chart(Visualizations.create_channel_distribution(processed_chats))
-                st.plotly_chart(Visualizations.create_conversion_by_source(processed_chats, processed_calls))
+    if background:
+        runner = get_job_runner(db_ops)
+        if st.button("Start ingestion job", disabled=not (call_files and chat_files)):
+            runner.submit(
+                [(file.name, file.getvalue()) for file in call_files],
+                [(file.name, file.getvalue()) for file in chat_files]
+            )
+        render_jobs(runner)
 
-            with col2:
-                st.plotly_chart(Visualizations.create_lead_funnel(processed_calls, processed_chats))
-                st.plotly_chart(Visualizations.create_response_time_distribution(processed_chats))
-                st.plotly_chart(Visualizations.create_agent_performance(processed_chats))
+        # Charts come from what is already stored while jobs run
+        if not history:
+            try:
+                render_stored_dashboard(db_ops)
+            except Exception as e:
+                st.error(f"Error loading stored analytics: {str(e)}")
 
-            # Show summary metrics
-            st.header("📊 Key Metrics")
-
-            metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
-
-            with metric_col1:
-                total_leads = len(processed_chats['phone_number'].unique())
-                st.metric("Total Leads", total_leads)
-
-            with metric_col2:
-                fresh_leads = len(processed_calls[processed_calls['is_fresh_lead']]['Call To'].unique())
-                st.metric("Fresh Leads", fresh_leads)
+    elif multiple and call_files and chat_files:
+        try:
+            summary = ingest_many_uploads(
+                tuple(upload_digest(file) for file in call_files),
+                tuple(upload_digest(file) for file in chat_files),
+                call_files, chat_files, db_ops
+            )
+            show_ingest_summary(summary)
 
-            with metric_col3:
-                avg_response_time = processed_chats['Total response time'].mean()
-                st.metric("Avg Response Time (s)", f"{avg_response_time:.2f}")
+            if not history:
+                explorer_dates = (summary['first_date'], summary['last_date'])
+                render_stored_dashboard(db_ops, summary['first_date'], summary['last_date'])
 
-            with metric_col4:
-                conversion_rate = (fresh_leads / total_leads * 100) if total_leads > 0 else 0
-                st.metric("Conversion Rate", f"{conversion_rate:.1f}%")
+        except Exception as e:
+            st.error(f"Error processing files: {str(e)}")
 
-            # Show raw data
-            st.header("🔍 Raw Data Preview")
-            tab1, tab2 = st.tabs(["Call Data", "Chat Data"])
+    elif not multiple and call_file is not None and chat_file is not None:
+        try:
+            # Processing and storage run once per distinct upload, not on every rerun
+            upload_key = (upload_digest(call_file), upload_digest(chat_file))
+            if streaming:
+                figures, summary = stream_upload(*upload_key, call_file, chat_file, db_ops)
+            else:
+                # Process chat data first, then call data against it for fresh lead detection
+                figures, summary = ingest_upload(*upload_key, call_file, chat_file, db_ops)
 
-            with tab1:
-                st.dataframe(processed_calls)
+            show_ingest_summary(summary)
 
-            with tab2:
-                st.dataframe(processed_chats)
+            if not history:
+                explorer_dates = (summary['first_date'], summary['last_date'])
+                staging = get_staging_cache()
+                staged_keys = (call_key(*upload_key), chat_key(upload_key[1]))
+                if figures is not None:
+                    render_dashboard(figures)
+                elif all(key in staging for key in staged_keys):
+                    render_dashboard(cached_staged_figures(upload_key, staging))
+                else:
+                    # Only new rows were processed, so read the upload's dates back from the database
+                    render_stored_dashboard(db_ops, summary['first_date'], summary['last_date'])
 
         except Exception as e:
             st.error(f"Error processing files: {str(e)}")
 
+    if history:
+        try:
+            render_stored_dashboard(db_ops, start_date, end_date)
+        except Exception as e:
+            st.error(f"Error loading stored analytics: {str(e)}")
+
+    try:
+        render_record_explorer(db_ops, *explorer_dates)
+    except Exception as e:
+        st.error(f"Error loading stored records: {str(e)}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""Memory and group-by timing of the compact processed frames against plain object columns.
+
+Run from the repository root with a call and a chat export:
+
+    python -m benchmarks.dtype_report calls.csv chats.csv
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from utils.pipeline import read_csv_chunks
+from utils.data_processor import DataProcessor
+from utils.schema import memory_usage
+
+
+def as_object_frame(df):
+    """The same frame with the column types the processors produced before the typing stage"""
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].astype(object)
+        elif pd.api.types.is_extension_array_dtype(df[column]):
+            df[column] = df[column].astype('float64')
+    for column in ('lead_date', 'call_date'):
+        if column in df.columns:
+            df[column] = df[column].dt.date
+    return df
+
+
+def time_groupbys(calls, chats, repeat=5):
+    """Time the group-bys the dashboard figures run"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        calls[calls['is_fresh_lead']].groupby(['lead_date', 'source'], observed=True).size()
+        chats.groupby('Employee', observed=True)[['Messages', 'Total response time', 'Conversation duration']].mean()
+        chats['Channel'].value_counts()
+        calls.loc[calls['Status'] == 'ANSWERED', 'Call To'].nunique()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('calls')
+    parser.add_argument('chats')
+    args = parser.parse_args()
+
+    chats = DataProcessor.process_chat_data(next(read_csv_chunks(args.chats)))
+    calls = DataProcessor.process_call_data(
+        next(read_csv_chunks(args.calls)),
+        lead_index=DataProcessor.build_lead_index(chats)
+    )
+    legacy_calls, legacy_chats = as_object_frame(calls), as_object_frame(chats)
+
+    print(f"{'':24}{'object columns':>16}{'compact':>16}{'ratio':>8}")
+    for name, legacy, compact in (('calls memory (MB)', legacy_calls, calls), ('chats memory (MB)', legacy_chats, chats)):
+        before, after = memory_usage(legacy) / 1e6, memory_usage(compact) / 1e6
+        print(f"{name:24}{before:16.1f}{after:16.1f}{before / after:7.1f}x")
+
+    before, after = time_groupbys(legacy_calls, legacy_chats), time_groupbys(calls, chats)
+    print(f"{'dashboard group-bys (s)':24}{before:16.3f}{after:16.3f}{before / after:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Compare per-element and Series-level phone standardization on a large column.
+
+Run from the repository root:
+
+    python -m benchmarks.phone_standardization --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import phone_utils
+from utils.phone_utils import standardize_phone_number, standardize_phone_series
+
+
+def make_phone_column(rows, distinct, seed=0):
+    """Build a column of raw phone values in the formats seen in the exports"""
+    rng = np.random.default_rng(seed)
+    numbers = [f"01{n:09d}" for n in rng.integers(0, 10**9, distinct)]
+    formats = [
+        lambda n: n,
+        lambda n: '+2' + n,
+        lambda n: f"<142> {n}",
+        lambda n: f"{n[:4]}-{n[4:7]}-{n[7:]}"
+    ]
+    pool = [formats[i % len(formats)](n) for i, n in enumerate(numbers)]
+    return pd.Series(np.asarray(pool, dtype=object)[rng.integers(0, distinct, rows)])
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--distinct', type=int, default=50000)
+    args = parser.parse_args()
+
+    column = make_phone_column(args.rows, args.distinct)
+
+    expected, per_element = timed(lambda s: s.apply(lambda x: standardize_phone_number(str(x))), column)
+
+    phone_utils._phone_cache.clear()
+    cold, cold_time = timed(standardize_phone_series, column)
+    warm, warm_time = timed(standardize_phone_series, column)
+
+    assert cold.equals(expected) and warm.equals(expected)
+
+    print(f"rows={args.rows} distinct={args.distinct}")
+    print(f"per-element apply:      {per_element:8.3f}s")
+    print(f"series (cold cache):    {cold_time:8.3f}s  ({per_element / cold_time:.1f}x)")
+    print(f"series (warm cache):    {warm_time:8.3f}s  ({per_element / warm_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
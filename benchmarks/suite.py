@@ -0,0 +1,189 @@
+"""Time the ingest and dashboard hot paths on synthetic exports and save the results as JSON.
+
+Run from the repository root; storage goes to a throwaway SQLite file unless
+--database-url points at a scratch database:
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --sizes 10000 100000 --compare bench.json
+"""
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from components.visualizations import Visualizations
+from database.models import init_db
+from database.operations import DatabaseAggregates, DatabaseOperations
+from utils import phone_utils
+from utils.data_processor import DataProcessor
+from utils.phone_utils import standardize_phone_series
+from utils.pipeline import read_csv_chunks
+
+from .synthetic import generate_exports
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# Visualizations builders timed on the processed frames, with the frames each one takes
+FIGURE_BUILDERS = {
+    'create_call_status_pie': ('calls',),
+    'create_hourly_call_volume': ('calls',),
+    'create_fresh_leads_by_date': ('calls',),
+    'create_channel_distribution': ('chats',),
+    'create_agent_performance': ('chats',),
+    'create_response_time_distribution': ('chats',),
+    'create_lead_funnel': ('calls', 'chats'),
+    'create_conversion_by_source': ('chats', 'calls')
+}
+
+
+def best_time(func, repeat):
+    """Fastest of repeat runs in seconds, and the last result"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def csv_buffer(df):
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    return buffer
+
+
+def stored_dashboard(db_ops):
+    """Every query the stored-history dashboard runs"""
+    aggregates = DatabaseAggregates(db_ops)
+    return (
+        aggregates.fresh_leads_by_date(), aggregates.channel_counts(), aggregates.funnel_counts(),
+        aggregates.conversion_by_source(), aggregates.agent_performance(),
+        aggregates.response_time_bins(), aggregates.key_metrics()
+    )
+
+
+def run_size(calls_rows, args, skip):
+    """Time every benchmark at one size, returning {name: seconds}"""
+    timings = {}
+
+    def bench(name, func, repeat=args.repeat):
+        if name.split('.')[0] in skip:
+            return None
+        timings[name], result = best_time(func, repeat)
+        print(f"  {name:50}{timings[name]:10.3f}s", file=sys.stderr)
+        return result
+
+    raw_calls, raw_chats = generate_exports(
+        calls_rows, calls_rows // 2, id_prefix=f"bench-{uuid.uuid4().hex[:8]}-", seed=args.seed
+    )
+    call_csv, chat_csv = csv_buffer(raw_calls), csv_buffer(raw_chats)
+
+    calls = next(read_csv_chunks(call_csv))
+    chats = next(read_csv_chunks(chat_csv))
+    bench('read_csv.calls', lambda: next(read_csv_chunks(call_csv)))
+    bench('read_csv.chats', lambda: next(read_csv_chunks(chat_csv)))
+
+    def standardize_cold():
+        phone_utils._phone_cache.clear()
+        return standardize_phone_series(calls['Call To'])
+
+    bench('standardize_phone_series.cold', standardize_cold)
+    bench('standardize_phone_series.warm', lambda: standardize_phone_series(calls['Call To']))
+
+    processed_chats = bench('process_chat_data', lambda: DataProcessor.process_chat_data(chats))
+    lead_index = DataProcessor.build_lead_index(chats)
+    bench('build_lead_index', lambda: DataProcessor.build_lead_index(chats))
+    bench('process_call_data.untagged', lambda: DataProcessor.process_call_data(calls))
+    processed_calls = bench(
+        'process_call_data.fresh_lead_matching', lambda: DataProcessor.process_call_data(calls, lead_index=lead_index)
+    )
+    if processed_chats is None:
+        processed_chats = DataProcessor.process_chat_data(chats)
+    if processed_calls is None:
+        processed_calls = DataProcessor.process_call_data(calls, lead_index=lead_index)
+
+    frames = {'calls': processed_calls, 'chats': processed_chats}
+    for name, frame_names in FIGURE_BUILDERS.items():
+        builder = getattr(Visualizations, name)
+        bench(f"visualizations.{name}", lambda: builder(*(frames[frame] for frame in frame_names)))
+
+    if 'storage' not in skip:
+        with tempfile.TemporaryDirectory() as directory:
+            engine = init_db(args.database_url or f"sqlite:///{directory}/bench.db")
+            db_ops = DatabaseOperations(engine)
+
+            # Inserts are not repeatable, so storage is timed once
+            bench('storage.store_chat_records', lambda: db_ops.store_chat_records(processed_chats), repeat=1)
+            bench('storage.store_call_records', lambda: db_ops.store_call_records(processed_calls), repeat=1)
+            bench('storage.stored_dashboard', lambda: stored_dashboard(db_ops))
+            engine.dispose()
+
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(results, baseline):
+    """Print each timing next to the same timing from an earlier results file"""
+    print(f"{'size':>9}  {'benchmark':50}{'baseline':>10}{'now':>10}{'ratio':>8}")
+    for size, timings in results['results'].items():
+        for name, seconds in timings.items():
+            before = baseline['results'].get(size, {}).get(name)
+            if before is None:
+                continue
+            print(f"{size:>9}  {name:50}{before:10.3f}{seconds:10.3f}{seconds / before:7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='call rows per run, with half as many chats (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the fastest is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip', nargs='*', default=[],
+                        help='benchmark groups to leave out, e.g. storage visualizations')
+    parser.add_argument('--database-url', help='scratch database for the storage benchmarks')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.platform(),
+        'database': args.database_url.split(':', 1)[0] if args.database_url else 'sqlite',
+        'results': {}
+    }
+    for size in args.sizes:
+        print(f"{size:,} calls / {size // 2:,} chats", file=sys.stderr)
+        results['results'][str(size)] = run_size(size, args, set(args.skip))
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as handle:
+            print_comparison(results, json.load(handle))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Generate realistic call and chat exports for benchmarks and local testing.
+
+Run from the repository root:
+
+    python -m benchmarks.synthetic --calls 100000 --chats 50000 --out sample_data
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+CHANNELS = ['WhatsApp', 'Facebook', 'Instagram', 'Website']
+CHANNEL_WEIGHTS = [0.45, 0.3, 0.15, 0.1]
+EMPLOYEES = ['Ahmed', 'Mona', 'Omar', 'Sara', 'Youssef', 'Nour', 'Karim', 'Laila']
+CALL_STATUSES = ['ANSWERED', 'NO ANSWER', 'BUSY', 'FAILED']
+CALL_STATUS_WEIGHTS = [0.55, 0.3, 0.1, 0.05]
+SOURCE_TRUNKS = ['Trunk-Main', 'Trunk-Backup', 'Trunk-Sales']
+
+# The raw phone formats seen in the exports
+PHONE_FORMATS = [
+    lambda n: n,
+    lambda n: '+2' + n,
+    lambda n: f"<142> {n}",
+    lambda n: f"{n[:4]}-{n[4:7]}-{n[7:]}"
+]
+
+
+def _phones(rng, count, offset=0):
+    """Distinct mobile numbers, each written in one of the export formats"""
+    numbers = rng.choice(10**9 // 2, size=count, replace=False) * 2 + offset  # Disjoint pools by parity
+    return np.array(
+        [PHONE_FORMATS[i % len(PHONE_FORMATS)](f"01{n:09d}") for i, n in enumerate(numbers)], dtype=object
+    )
+
+
+def _timestamps(start, seconds):
+    return (pd.Timestamp(start) + pd.to_timedelta(seconds, unit='s')).astype(str)
+
+
+def generate_exports(calls, chats, phone_reuse=2.0, fresh_lead_ratio=0.3, days=30,
+                     start='2025-01-01', missing_ratio=0.01, id_prefix='', seed=0):
+    """Build raw call and chat frames with the columns and formats of the real exports.
+
+    Each lead phone appears in about phone_reuse chats. About fresh_lead_ratio
+    of the calls go to a chat's number on the day of that chat, the rest go
+    to numbers that never chatted. missing_ratio of the chats have no
+    creation date, as happens in the exports.
+    """
+    rng = np.random.default_rng(seed)
+    span = days * 86400
+
+    lead_phones = _phones(rng, max(int(chats / phone_reuse), 1))
+    chat_phones = lead_phones[rng.integers(0, len(lead_phones), chats)]
+    created = rng.integers(0, span, chats)
+    replied = created + rng.integers(5, 900, chats)
+    last_message = replied + rng.integers(0, 3600, chats)
+    closed = last_message + rng.integers(0, 600, chats)
+    created_on = np.asarray(_timestamps(start, created), dtype=object)
+    created_on[rng.random(chats) < missing_ratio] = None
+    total_response = rng.exponential(120, chats).round(1)
+
+    chat_df = pd.DataFrame({
+        '#': [f"{id_prefix}{i}" for i in range(chats)],
+        'Type': 'Chat',
+        'Status': rng.choice(['Closed', 'Open'], chats, p=[0.9, 0.1]),
+        'Channel': rng.choice(CHANNELS, chats, p=CHANNEL_WEIGHTS),
+        'Client': chat_phones,
+        'Messages': rng.integers(1, 60, chats),
+        'Employee': rng.choice(EMPLOYEES, chats),
+        'Created on': created_on,
+        'Agent replied on': _timestamps(start, replied),
+        'Last message posted on': _timestamps(start, last_message),
+        'Agent closed on': _timestamps(start, closed),
+        'Waiting for agent to respond': rng.integers(0, 300, chats),
+        'Conversation duration': closed - created,
+        'Chat bot time': rng.integers(0, 120, chats),
+        'Initial response time': replied - created,
+        'Total response time': total_response,
+        'Average response time': (total_response / 2).round().astype(int),
+        'Maximum response time': (total_response * 2).round().astype(int),
+        'CRM record': rng.choice(['Yes', 'No'], chats)
+    })
+
+    # Fresh-lead calls reach a dated chat's number later on the same day
+    dated = np.flatnonzero(pd.notna(created_on))
+    fresh = rng.random(calls) < fresh_lead_ratio if len(dated) else np.zeros(calls, dtype=bool)
+    picked = dated[rng.integers(0, len(dated), fresh.sum())] if len(dated) else np.array([], dtype=int)
+    call_seconds = rng.integers(0, span, calls)
+    day_start = created[picked] // 86400 * 86400
+    call_seconds[fresh] = np.minimum(created[picked] + rng.integers(0, 3600, len(picked)), day_start + 86399)
+
+    other_phones = _phones(rng, max(calls // 3, 1), offset=1)
+    call_to = other_phones[rng.integers(0, len(other_phones), calls)]
+    call_to[fresh] = chat_phones[picked]
+
+    talk = rng.integers(0, 900, calls)
+    ring = rng.integers(0, 40, calls)
+    status = rng.choice(CALL_STATUSES, calls, p=CALL_STATUS_WEIGHTS)
+    talk[status != 'ANSWERED'] = 0
+
+    call_df = pd.DataFrame({
+        'ID': [f"{id_prefix}{i}\t" for i in range(calls)],
+        'Time': _timestamps(start, call_seconds),
+        'Call From': [f"<142> 1{i % 40:02d}" for i in range(calls)],
+        'Call To': call_to,
+        'Call Duration': ring + talk,
+        'Ring Duration': ring,
+        'Talk Duration': talk,
+        'Status': status,
+        'Recording File': np.where(status == 'ANSWERED', [f"rec_{i}.wav" for i in range(calls)], None),
+        'Source Trunk': rng.choice(SOURCE_TRUNKS, calls),
+        'Communication Type': 'Outbound'
+    })
+    return call_df, chat_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--chats', type=int, default=50000)
+    parser.add_argument('--phone-reuse', type=float, default=2.0, help='average chats per lead phone number')
+    parser.add_argument('--fresh-lead-ratio', type=float, default=0.3, help='share of calls that are fresh leads')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='.', help='directory for calls.csv and chats.csv')
+    args = parser.parse_args()
+
+    calls, chats = generate_exports(
+        args.calls, args.chats, phone_reuse=args.phone_reuse,
+        fresh_lead_ratio=args.fresh_lead_ratio, days=args.days, seed=args.seed
+    )
+    os.makedirs(args.out, exist_ok=True)
+    calls.to_csv(os.path.join(args.out, 'calls.csv'), index=False)
+    chats.to_csv(os.path.join(args.out, 'chats.csv'), index=False)
+    print(f"Wrote {len(calls):,} calls and {len(chats):,} chats to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,40 @@
+import math
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+from utils.instrumentation import instrumented
+from utils.lead_metrics import LeadMetrics
+from utils.schema import AGENT_COLUMNS, RESPONSE_TIME_BIN_WIDTH
+
+# Upper bounds on what a figure sends to the browser, whatever the size of the data
+MAX_HISTOGRAM_BINS = 120
+MAX_DATE_POINTS = 180
 
 class Visualizations:
+    # Processed columns each frame-based figure reads, so staged frames can be loaded with only those
+    CALL_COLUMNS = {
+        'create_call_status_pie': ['Status'],
+        'create_hourly_call_volume': ['Time'],
+        'create_fresh_leads_by_date': ['is_fresh_lead', 'lead_date', 'source'],
+        'create_lead_funnel': LeadMetrics.CALL_COLUMNS,
+        'create_conversion_by_source': LeadMetrics.CALL_COLUMNS
+    }
+    CHAT_COLUMNS = {
+        'create_agent_performance': ['Employee'] + AGENT_COLUMNS,
+        'create_channel_distribution': ['Channel'],
+        'create_lead_funnel': LeadMetrics.CHAT_COLUMNS,
+        'create_response_time_distribution': ['Total response time'],
+        'create_conversion_by_source': LeadMetrics.CHAT_COLUMNS
+    }
+
+    @staticmethod
+    def columns_for(column_map, methods):
+        """Union of the columns the given figure methods read, in a stable order"""
+        return list(dict.fromkeys(column for method in methods for column in column_map.get(method, [])))
+
     @staticmethod
+    @instrumented()
     def create_call_status_pie(df):
         status_counts = df['Status'].value_counts()
         fig = px.pie(
@@ -14,9 +45,52 @@ class Visualizations:
         return fig
 
     @staticmethod
+    def bin_width(start, end, base_width, max_bins):
+        """Smallest multiple of base_width that covers start..end in at most max_bins bins"""
+        return base_width * max(math.ceil((end - start) / (base_width * max_bins)), 1)
+
+    @staticmethod
+    def bin_response_times(values, max_bins=MAX_HISTOGRAM_BINS):
+        """Histogram of response times as bin_start/count rows, binned with NumPy on the shared 30s grid"""
+        values = pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        # Missing and infinite values (pd.to_numeric reads 'inf') cannot be binned
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return pd.DataFrame({'bin_start': pd.Series(dtype='float64'), 'count': pd.Series(dtype='int64')})
+
+        width = Visualizations.bin_width(values.min(), values.max(), RESPONSE_TIME_BIN_WIDTH, max_bins)
+        first = np.floor(values.min() / width)
+        counts = np.bincount((np.floor(values / width) - first).astype(np.int64))
+        bins = pd.DataFrame({'bin_start': (first + np.arange(len(counts))) * width, 'count': counts})
+        return bins[bins['count'] > 0].reset_index(drop=True)
+
+    @staticmethod
+    def coarsen_bins(bins, max_bins=MAX_HISTOGRAM_BINS):
+        """Merge neighbouring pre-computed bins until there are at most max_bins"""
+        if len(bins) <= max_bins:
+            return bins
+        width = Visualizations.bin_width(
+            bins['bin_start'].min(), bins['bin_start'].max(), RESPONSE_TIME_BIN_WIDTH, max_bins
+        )
+        starts = np.floor(bins['bin_start'] / width) * width
+        return bins.groupby(starts.rename('bin_start'))['count'].sum().reset_index()
+
+    @staticmethod
+    def coarsen_dates(counts, max_points=MAX_DATE_POINTS):
+        """Sum per-day counts into weeks, then months, when there are more than max_points days"""
+        for period in ('W', 'M'):
+            if counts['lead_date'].nunique() <= max_points:
+                break
+            dates = pd.to_datetime(counts['lead_date'])  # Stored rollups return date objects
+            counts = counts.assign(lead_date=dates.dt.to_period(period).dt.start_time)
+            counts = counts.groupby(['lead_date', 'source'], as_index=False, observed=True)['count'].sum()
+        return counts
+
+    @staticmethod
+    @instrumented()
     def create_hourly_call_volume(df):
-        df['hour'] = pd.to_datetime(df['Time']).dt.hour
-        hourly_counts = df['hour'].value_counts().sort_index()
+        hours = pd.to_datetime(df['Time']).dt.hour
+        hourly_counts = hours.value_counts().reindex(range(24), fill_value=0)
         fig = px.line(
             x=hourly_counts.index,
             y=hourly_counts.values,
@@ -26,13 +100,14 @@ class Visualizations:
         return fig
 
     @staticmethod
+    @instrumented()
     def create_agent_performance(df):
-        agent_stats = df.groupby('Employee').agg({
-            'Messages': 'mean',
-            'Total response time': 'mean',
-            'Conversation duration': 'mean'
-        }).round(2)
+        agent_stats = df.groupby('Employee', observed=True)[AGENT_COLUMNS].mean().round(2)
+        return Visualizations.plot_agent_performance(agent_stats)
 
+    @staticmethod
+    @instrumented()
+    def plot_agent_performance(agent_stats):
         fig = px.bar(
             agent_stats,
             barmode='group',
@@ -41,8 +116,15 @@ class Visualizations:
         return fig
 
     @staticmethod
+    @instrumented()
     def create_channel_distribution(df):
         channel_counts = df['Channel'].value_counts()
+        channel_counts = channel_counts[channel_counts > 0]  # Unused categories
+        return Visualizations.plot_channel_distribution(channel_counts)
+
+    @staticmethod
+    @instrumented()
+    def plot_channel_distribution(channel_counts):
         fig = px.bar(
             x=channel_counts.index,
             y=channel_counts.values,
@@ -52,8 +134,20 @@ class Visualizations:
         return fig
 
     @staticmethod
+    @instrumented()
     def create_fresh_leads_by_date(df):
-        fresh_leads = df[df['is_fresh_lead']].groupby(['lead_date', 'source']).size().reset_index(name='count')
+        fresh_leads = (
+            df[df['is_fresh_lead']]
+            .groupby(['lead_date', 'source'], observed=True)
+            .size()
+            .reset_index(name='count')
+        )
+        return Visualizations.plot_fresh_leads_by_date(fresh_leads)
+
+    @staticmethod
+    @instrumented()
+    def plot_fresh_leads_by_date(fresh_leads):
+        fresh_leads = Visualizations.coarsen_dates(fresh_leads)
         fig = px.bar(
             fresh_leads,
             x='lead_date',
@@ -65,11 +159,14 @@ class Visualizations:
         return fig
 
     @staticmethod
-    def create_lead_funnel(df_calls, df_chats):
-        total_leads = len(df_chats['phone_number'].unique())
-        contacted_leads = len(df_calls['Call To'].unique())
-        answered_calls = len(df_calls[df_calls['Status'] == 'ANSWERED']['Call To'].unique())
+    @instrumented()
+    def create_lead_funnel(df_calls, df_chats, metrics=None):
+        metrics = metrics or LeadMetrics(df_calls, df_chats)
+        return Visualizations.plot_lead_funnel(**metrics.funnel_counts())
 
+    @staticmethod
+    @instrumented()
+    def plot_lead_funnel(total_leads, contacted_leads, answered_calls):
         fig = go.Figure(go.Funnel(
             y=['Total Leads', 'Contacted Leads', 'Answered Calls'],
             x=[total_leads, contacted_leads, answered_calls]
@@ -78,37 +175,35 @@ class Visualizations:
         return fig
 
     @staticmethod
+    @instrumented()
     def create_response_time_distribution(df):
-        fig = px.histogram(
-            df,
-            x='Total response time',
+        # Binned here so the figure holds one bar per bin rather than every chat
+        return Visualizations.plot_response_time_bins(Visualizations.bin_response_times(df['Total response time']))
+
+    @staticmethod
+    @instrumented()
+    def plot_response_time_bins(bins):
+        """Plot a response time histogram from pre-computed bin_start/count rows"""
+        bins = Visualizations.coarsen_bins(bins)
+        fig = px.bar(
+            bins,
+            x='bin_start',
+            y='count',
             title='Response Time Distribution',
-            labels={'Total response time': 'Response Time (seconds)'}
+            labels={'bin_start': 'Response Time (seconds)', 'count': 'count'}
         )
+        fig.update_layout(bargap=0)
         return fig
 
     @staticmethod
-    def create_conversion_by_source(df_chats, df_calls):
-        # Calculate conversion rates by source
-        sources = df_chats['Channel'].unique()
-        conversion_data = []
-
-        for source in sources:
-            source_leads = df_chats[df_chats['Channel'] == source]['phone_number'].unique()
-            converted = df_calls[
-                (df_calls['Call To'].isin(source_leads)) & 
-                (df_calls['Status'] == 'ANSWERED')
-            ]['Call To'].nunique()
-
-            total = len(source_leads)
-            conversion_rate = (converted / total * 100) if total > 0 else 0
+    @instrumented()
+    def create_conversion_by_source(df_chats, df_calls, metrics=None):
+        metrics = metrics or LeadMetrics(df_calls, df_chats)
+        return Visualizations.plot_conversion_by_source(metrics.conversion_by_source())
 
-            conversion_data.append({
-                'source': source,
-                'conversion_rate': conversion_rate
-            })
-
-        df_conversion = pd.DataFrame(conversion_data)
+    @staticmethod
+    @instrumented()
+    def plot_conversion_by_source(df_conversion):
         fig = px.bar(
             df_conversion,
             x='source',
@@ -116,4 +211,4 @@ class Visualizations:
             title='Conversion Rate by Source',
             labels={'source': 'Source', 'conversion_rate': 'Conversion Rate (%)'}
         )
-        return fig
\ No newline at end of file
+        return fig
@@ -0,0 +1,154 @@
+import pandas as pd
+from sqlalchemy import bindparam, insert, inspect, select, text, update
+
+# Chat rows read and rewritten per step while standardizing stored phone numbers
+MIGRATION_BATCH_SIZE = 10000
+
+
+def apply_indexes(engine, metadata=None):
+    """Create any index declared on the models that an existing database is missing.
+
+    Base.metadata.create_all only creates indexes together with new tables, so
+    databases created before an index was added would otherwise never get it.
+    Returns the names of the indexes that were created.
+    """
+    if metadata is None:
+        from .models import Base
+        metadata = Base.metadata
+
+    inspector = inspect(engine)
+    created = []
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+
+    return created
+
+
+def _add_missing_columns(engine, table, names):
+    """ALTER an existing table to add the columns declared on its model that it doesn't have yet"""
+    existing = {column['name'] for column in inspect(engine).get_columns(table.name)}
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as connection:
+        for name in names:
+            if name in existing:
+                continue
+            column = table.c[name]
+            connection.execute(text(
+                f'ALTER TABLE {preparer.format_table(table)} '
+                f'ADD {preparer.format_column(column)} {column.type.compile(dialect=engine.dialect)}'
+            ))
+
+
+def standardize_chat_phones(engine, batch_size=MIGRATION_BATCH_SIZE):
+    """Rewrite chat phone numbers stored as raw Client text in the standardized form calls are joined on.
+
+    Returns True, as the rollups are rebuilt after it.
+    """
+    from utils.phone_utils import standardize_phone_series
+    from .models import ChatRecord
+
+    chats = ChatRecord.__table__
+    set_phone = (
+        update(chats)
+        .where(chats.c.id == bindparam('chat_row_id'))
+        .values(phone_number=bindparam('standardized'))
+    )
+
+    last_id = 0
+    while True:
+        with engine.begin() as connection:
+            rows = pd.DataFrame(
+                connection.execute(
+                    select(chats.c.id, chats.c.phone_number)
+                    .where(chats.c.id > last_id)
+                    .order_by(chats.c.id)
+                    .limit(batch_size)
+                ).all(),
+                columns=['id', 'phone_number']
+            )
+            if rows.empty:
+                return True
+
+            # Standardizing is idempotent, so numbers stored standardized are left as they are
+            standardized = standardize_phone_series(rows['phone_number'])
+            changed = rows[standardized != rows['phone_number']]
+            if not changed.empty:
+                connection.execute(set_phone, [
+                    {'chat_row_id': int(row_id), 'standardized': phone}
+                    for row_id, phone in zip(changed['id'], standardized[changed.index])
+                ])
+            last_id = int(rows['id'].iloc[-1])
+
+
+def add_lead_channel(engine):
+    """Keep the matched chat channel of fresh leads in lead_channel instead of over the source trunk.
+
+    Fresh leads stored earlier had their trunk replaced by the channel; that
+    trunk is gone, but lead_channel is filled from the earliest stored chat
+    they match. The call rollups are recreated with the new key and left empty,
+    so it returns True for the caller to rebuild them.
+    """
+    from .models import CallRecord, ChatRecord, DailyCallRollup
+
+    _add_missing_columns(engine, CallRecord.__table__, ['lead_channel'])
+    if 'lead_channel' not in {column['name'] for column in inspect(engine).get_columns(DailyCallRollup.__tablename__)}:
+        DailyCallRollup.__table__.drop(engine)
+        DailyCallRollup.__table__.create(engine)
+
+    calls = CallRecord.__table__
+    first_channel = (
+        select(ChatRecord.channel)
+        .where(ChatRecord.phone_number == calls.c.call_to, ChatRecord.lead_date == calls.c.call_date)
+        .order_by(ChatRecord.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    with engine.begin() as connection:
+        connection.execute(
+            update(calls)
+            .where(calls.c.is_fresh_lead == True, calls.c.lead_channel.is_(None))
+            .values(lead_channel=first_channel)
+        )
+    return True
+
+
+def add_job_owners(engine):
+    """Give ingest jobs an owner and heartbeat, so a runner only fails the jobs of runners that stopped"""
+    from .models import IngestJob
+
+    _add_missing_columns(engine, IngestJob.__table__, ['owner', 'heartbeat_at'])
+    return False
+
+
+# Data migrations in the order they run; each is recorded by name once it has run,
+# and returns whether the rollups must be rebuilt after it
+MIGRATIONS = [
+    ('standardize_chat_phones', standardize_chat_phones),
+    ('add_lead_channel', add_lead_channel),
+    ('add_job_owners', add_job_owners),
+]
+
+
+def apply_migrations(engine):
+    """Run the data migrations this database has not had yet, returning whether the rollups need rebuilding"""
+    from .models import AppliedMigration
+
+    with engine.connect() as connection:
+        applied = set(connection.execute(select(AppliedMigration.name)).scalars())
+
+    stale_rollups = False
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        stale_rollups = migrate(engine) or stale_rollups
+        with engine.begin() as connection:
+            connection.execute(insert(AppliedMigration).values(name=name))
+
+    return stale_rollups
@@ -1,57 +1,232 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Date, create_engine
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Date, Index, UniqueConstraint, create_engine, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from datetime import datetime
 import os
+import threading
+from sqlalchemy.engine import make_url
+from .migrations import apply_indexes, apply_migrations
 
 Base = declarative_base()
 
+# Lengths for text columns used in indexes and unique constraints. A bare String is
+# VARCHAR(max) on SQL Server, which cannot be an index key.
+KEY_LENGTH = 100
+PHONE_LENGTH = 64
+STATUS_LENGTH = 50
+NAME_LENGTH = 255
+
 class CallRecord(Base):
     __tablename__ = 'call_records'
+    __table_args__ = (
+        # Fresh-lead matching joins call_to + call_date against chat phone_number + lead_date
+        Index('ix_call_records_call_to_call_date', 'call_to', 'call_date'),
+        # Funnel and conversion queries look up answered calls per number
+        Index('ix_call_records_status_call_to', 'status', 'call_to'),
+        # Dashboard date-range filters
+        Index('ix_call_records_call_date_status', 'call_date', 'status'),
+    )
 
     id = Column(Integer, primary_key=True)
-    call_id = Column(String, unique=True, nullable=False)
+    call_id = Column(String(KEY_LENGTH), unique=True, nullable=False)
     timestamp = Column(DateTime, nullable=True)
     call_from = Column(String, nullable=True)
-    call_to = Column(String, nullable=True)
+    call_to = Column(String(PHONE_LENGTH), nullable=True)
     duration = Column(Float, nullable=True)
-    status = Column(String, nullable=True)
+    status = Column(String(STATUS_LENGTH), nullable=True)
     recording_file = Column(String, nullable=True)
     call_date = Column(Date, nullable=True)
     is_fresh_lead = Column(Boolean, default=False)
-    source = Column(String, nullable=True)
+    source = Column(String(NAME_LENGTH), nullable=True)  # Source Trunk from the call export
+    lead_channel = Column(String(NAME_LENGTH), nullable=True)  # Channel of the matched chat lead, for fresh leads
     ring_duration = Column(Float, nullable=True)
     talk_duration = Column(Float, nullable=True)
     communication_type = Column(String, nullable=True)
 
 class ChatRecord(Base):
     __tablename__ = 'chat_records'
+    __table_args__ = (
+        Index('ix_chat_records_phone_number_lead_date', 'phone_number', 'lead_date'),
+        # Conversion by source counts distinct numbers per channel
+        Index('ix_chat_records_channel_phone_number', 'channel', 'phone_number'),
+        Index('ix_chat_records_employee', 'employee'),
+        Index('ix_chat_records_lead_date', 'lead_date'),
+    )
 
     id = Column(Integer, primary_key=True)
-    chat_id = Column(String, unique=True, nullable=False)
+    chat_id = Column(String(KEY_LENGTH), unique=True, nullable=False)
     type = Column(String, nullable=True)
-    status = Column(String, nullable=True)
-    channel = Column(String, nullable=True)
+    status = Column(String(STATUS_LENGTH), nullable=True)
+    channel = Column(String(NAME_LENGTH), nullable=True)
     client = Column(String, nullable=True)
     messages = Column(Integer, nullable=True)
-    employee = Column(String, nullable=True)
+    employee = Column(String(NAME_LENGTH), nullable=True)
     created_on = Column(DateTime, nullable=True)
     closed_on = Column(DateTime, nullable=True)
     response_time = Column(Float, nullable=True)
     lead_date = Column(Date, nullable=True)
-    phone_number = Column(String, nullable=True)
+    phone_number = Column(String(PHONE_LENGTH), nullable=True)
     is_fresh_lead = Column(Boolean, default=False)
     crm_record = Column(Boolean, default=False)
     conversation_duration = Column(Integer, nullable=True)
     initial_response_time = Column(Integer, nullable=True)
     average_response_time = Column(Integer, nullable=True)
 
-def init_db():
-    # Fixed connection string for SQL Server using Windows Authentication
-    connection_string = (
-        "mssql+pyodbc://DESKTOP-R753PEO/DataUploaderDB"
-        "?driver=ODBC+Driver+17+for+SQL+Server"
-        "&trusted_connection=yes"
+class DailyCallRollup(Base):
+    """Call totals per day, source trunk and lead channel, kept up to date as call batches are stored"""
+    __tablename__ = 'daily_call_rollups'
+    __table_args__ = (UniqueConstraint('call_date', 'source', 'lead_channel'),)
+
+    id = Column(Integer, primary_key=True)
+    call_date = Column(Date, nullable=False)
+    source = Column(String(NAME_LENGTH), nullable=False, default='')  # '' when the call has no source
+    lead_channel = Column(String(NAME_LENGTH), nullable=False, default='')  # '' unless the calls are fresh leads
+    call_count = Column(Integer, nullable=False, default=0)
+    answered_count = Column(Integer, nullable=False, default=0)
+    fresh_lead_count = Column(Integer, nullable=False, default=0)
+    duration_sum = Column(Float, nullable=False, default=0.0)
+
+class DailyChatRollup(Base):
+    """Chat totals per day, channel and employee, kept up to date as chat batches are stored"""
+    __tablename__ = 'daily_chat_rollups'
+    __table_args__ = (UniqueConstraint('lead_date', 'channel', 'employee'),)
+
+    id = Column(Integer, primary_key=True)
+    lead_date = Column(Date, nullable=False)
+    channel = Column(String(NAME_LENGTH), nullable=False, default='')  # '' when the chat has no channel
+    employee = Column(String(NAME_LENGTH), nullable=False, default='')  # '' when the chat has no employee
+    chat_count = Column(Integer, nullable=False, default=0)
+    messages_sum = Column(Integer, nullable=False, default=0)
+    response_time_sum = Column(Float, nullable=False, default=0.0)
+    response_time_count = Column(Integer, nullable=False, default=0)
+    conversation_duration_sum = Column(Integer, nullable=False, default=0)
+
+class IngestedFile(Base):
+    """Ledger of uploaded files, keyed by content digest, so identical re-uploads can be skipped"""
+    __tablename__ = 'ingested_files'
+
+    id = Column(Integer, primary_key=True)
+    digest = Column(String(64), unique=True, nullable=False)
+    file_type = Column(String, nullable=False)  # 'call' or 'chat'
+    file_name = Column(String, nullable=True)
+    row_count = Column(Integer, nullable=False, default=0)
+    first_date = Column(Date, nullable=True)
+    last_date = Column(Date, nullable=True)
+    ingested_at = Column(DateTime, default=datetime.utcnow)
+
+    chunks = relationship('IngestedChunk', back_populates='file', cascade='all, delete-orphan')
+
+class IngestedChunk(Base):
+    """Row-key range covered by one chunk of an ingested file"""
+    __tablename__ = 'ingested_chunks'
+
+    id = Column(Integer, primary_key=True)
+    file_id = Column(Integer, ForeignKey('ingested_files.id'), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    min_key = Column(String, nullable=True)
+    max_key = Column(String, nullable=True)
+
+    file = relationship('IngestedFile', back_populates='chunks')
+
+class AppliedMigration(Base):
+    """Data migrations already run on this database, so each runs once"""
+    __tablename__ = 'schema_migrations'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), unique=True, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+class IngestJob(Base):
+    """A background ingestion run and its progress, polled by the dashboard"""
+    __tablename__ = 'ingest_jobs'
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String, nullable=False, default='queued')  # queued, running, completed, failed or cancelled
+    file_names = Column(String, nullable=True)
+    total_rows = Column(Integer, nullable=False, default=0)
+    processed_rows = Column(Integer, nullable=False, default=0)
+    calls_inserted = Column(Integer, nullable=False, default=0)
+    calls_skipped = Column(Integer, nullable=False, default=0)
+    chats_inserted = Column(Integer, nullable=False, default=0)
+    chats_skipped = Column(Integer, nullable=False, default=0)
+    first_date = Column(Date, nullable=True)
+    last_date = Column(Date, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    error = Column(String, nullable=True)
+    owner = Column(String(KEY_LENGTH), nullable=True)  # Runner that queued the job: host, pid and a random suffix
+    heartbeat_at = Column(DateTime, nullable=True)  # Last time the owner reported it was still alive
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+# SQL Server using Windows Authentication, used when DATABASE_URL is not set
+DEFAULT_DATABASE_URL = (
+    "mssql+pyodbc://DESKTOP-R753PEO/DataUploaderDB"
+    "?driver=ODBC+Driver+17+for+SQL+Server"
+    "&trusted_connection=yes"
+)
+
+# One engine per database URL per process, so schema setup runs once
+_engines = {}
+_engines_lock = threading.Lock()
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+def get_database_url():
+    """Database URL from DATABASE_URL, e.g. postgresql://..., mssql+pyodbc://... or sqlite:///leads.db"""
+    url = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+
+    # Hosted PostgreSQL often hands out the scheme SQLAlchemy no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url):
+    """Pool and driver settings for an engine, tunable through DB_* environment variables"""
+    url = make_url(url)
+    options = {'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True)}
+
+    # The local SQLite stand-in keeps SQLAlchemy's default pool for its file/memory mode
+    if url.get_backend_name() == 'sqlite':
+        return options
+
+    options.update(
+        pool_size=_env_int('DB_POOL_SIZE', 5),
+        max_overflow=_env_int('DB_MAX_OVERFLOW', 10),
+        pool_recycle=_env_int('DB_POOL_RECYCLE', 1800),
+        pool_timeout=_env_int('DB_POOL_TIMEOUT', 30)
     )
-    engine = create_engine(connection_string)
-    Base.metadata.create_all(engine)  # Create tables if they don't exist
-    return engine
\ No newline at end of file
+
+    if url.drivername == 'mssql+pyodbc':
+        options['fast_executemany'] = _env_bool('DB_FAST_EXECUTEMANY', True)
+    elif url.drivername in ('postgresql', 'postgresql+psycopg2'):
+        # Batch executemany into execute_values-style pages
+        options['executemany_mode'] = 'values_plus_batch'
+    return options
+
+def init_db(database_url=None):
+    """Return the shared engine for the configured database, creating the schema on first use"""
+    url = database_url or get_database_url()
+
+    with _engines_lock:
+        if url in _engines:
+            return _engines[url]
+
+        engine = create_engine(url, **engine_options(url))
+        rollups_missing = not inspect(engine).has_table(DailyCallRollup.__tablename__)
+        Base.metadata.create_all(engine)  # Create tables if they don't exist
+        stale_rollups = apply_migrations(engine)  # Before the indexes, which may cover columns a migration adds
+        apply_indexes(engine)  # create_all skips indexes on tables that already exist
+
+        # Databases created before the rollup tables existed, or migrated since, need them rebuilt once
+        if rollups_missing or stale_rollups:
+            from .operations import DatabaseOperations
+            DatabaseOperations(engine).rebuild_rollups()
+
+        _engines[url] = engine
+        return engine
@@ -1,16 +1,86 @@
 import os
 from sqlalchemy.orm import sessionmaker
-from .models import CallRecord, ChatRecord
+from .models import CallRecord, ChatRecord, DailyCallRollup, DailyChatRollup, IngestedFile, IngestedChunk, IngestJob
 import pandas as pd
 from datetime import datetime
 from sqlalchemy.orm import Session
 from contextlib import contextmanager
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import case, select, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy import case, select, func, distinct, delete, update, or_
+from utils.instrumentation import instrumented, span
+from utils.phone_utils import standardize_phone_number, standardize_phone_series
+from utils.schema import AGENT_COLUMNS, RESPONSE_TIME_BIN_WIDTH
+
+# Rows per multi-row INSERT; keeps each statement well under driver parameter limits
+DEFAULT_BATCH_SIZE = 1000
+
+# Dialects whose INSERT supports ON CONFLICT and RETURNING
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+# Each call rollup row totals one day, source trunk and lead channel
+CALL_ROLLUP_KEYS = ['call_date', 'source', 'lead_channel']
+
+# Stored key column for each kind of uploaded file
+RECORD_KEYS = {
+    'call': CallRecord.call_id,
+    'chat': ChatRecord.chat_id
+}
+
+# Raw data explorer settings per record type: the date and phone columns its filters use,
+# and the columns it may sort on, each the leading column of an index
+EXPLORER_COLUMNS = {
+    'call': {
+        'model': CallRecord,
+        'date': CallRecord.call_date,
+        'phone': CallRecord.call_to,
+        'channel': CallRecord.source,
+        'employee': None,
+        'sort': {'Date': CallRecord.call_date, 'Phone': CallRecord.call_to, 'Status': CallRecord.status}
+    },
+    'chat': {
+        'model': ChatRecord,
+        'date': ChatRecord.lead_date,
+        'phone': ChatRecord.phone_number,
+        'channel': ChatRecord.channel,
+        'employee': ChatRecord.employee,
+        'sort': {
+            'Date': ChatRecord.lead_date, 'Phone': ChatRecord.phone_number,
+            'Channel': ChatRecord.channel, 'Employee': ChatRecord.employee
+        }
+    }
+}
+
+
+def _date_range(column, start=None, end=None):
+    """Build the WHERE conditions for an optional inclusive date range"""
+    conditions = []
+    if start is not None:
+        conditions.append(column >= start)
+    if end is not None:
+        conditions.append(column <= end)
+    return conditions
+
+
+def _phone_prefix(text):
+    """Standardized prefix for a full or partial phone number typed into a filter"""
+    digits = standardize_phone_number(text)
+    return '2' + digits if digits.startswith('0') else digits  # Stored local numbers carry the country code
+
+
+def _without_categories(df):
+    """Turn categorical columns back into plain values so they can be filled and compared freely"""
+    categorical = df.select_dtypes('category').columns
+    return df.astype({column: object for column in categorical}) if len(categorical) else df
+
 
 class DatabaseOperations:
     def __init__(self, engine):
         self.Session = sessionmaker(bind=engine)
+        self.dialect = engine.dialect.name
+        self.upsert_insert = UPSERT_INSERTS.get(self.dialect)
 
     @contextmanager
     def session_scope(self):
@@ -25,55 +95,458 @@ class DatabaseOperations:
         finally:
             session.close()
 
-    def store_call_records(self, df):
+    @instrumented()
+    def store_call_records(self, df, batch_size=DEFAULT_BATCH_SIZE):
         """Store call records with enhanced data capture"""
+        df = _without_categories(df)
+        timestamps = pd.to_datetime(df['Time'])
+
+        # Fresh leads also carry the channel of the chat they matched; source keeps the trunk
+        lead_channel = None
+        if 'source' in df and 'is_fresh_lead' in df:
+            lead_channel = df['source'].where(df['is_fresh_lead'].astype(bool), None)
+
+        records = pd.DataFrame({
+            'call_id': df['ID'],
+            'timestamp': timestamps,
+            'call_from': df['Call From'],
+            'call_to': df['Call To'],
+            'duration': pd.to_numeric(df['Call Duration'], errors='coerce').fillna(0.0),
+            'ring_duration': pd.to_numeric(df['Ring Duration'], errors='coerce').fillna(0.0),
+            'talk_duration': pd.to_numeric(df['Talk Duration'], errors='coerce').fillna(0.0),
+            'status': df['Status'],
+            'recording_file': df['Recording File'].astype(str).where(df['Recording File'].notna()),
+            'call_date': timestamps.dt.date,
+            'is_fresh_lead': df.get('is_fresh_lead', False),
+            'source': df.get('Source Trunk'),
+            'lead_channel': lead_channel,
+            'communication_type': df.get('Communication Type')
+        }, index=df.index)
+        return self._bulk_insert(CallRecord, 'call_id', records, batch_size, self._after_call_insert)
+
+    @instrumented()
+    def store_chat_records(self, df, batch_size=DEFAULT_BATCH_SIZE):
+        """Store chat records with enhanced metrics"""
+        df = _without_categories(df)
+        created_on = pd.to_datetime(df['Created on'])
+        crm_record = df['CRM record']
+        records = pd.DataFrame({
+            'chat_id': df['#'].astype(str),
+            'type': df['Type'],
+            'status': df['Status'],
+            'channel': df['Channel'],
+            'client': df['Client'],
+            'messages': pd.to_numeric(df['Messages'], errors='coerce').fillna(0).astype(int),
+            'employee': df['Employee'],
+            'created_on': created_on,
+            'closed_on': pd.to_datetime(df['Agent closed on']),
+            'response_time': pd.to_numeric(df['Total response time'], errors='coerce').fillna(0.0),
+            'lead_date': created_on.dt.date,
+            'phone_number': df['phone_number'] if 'phone_number' in df else standardize_phone_series(df['Client']),
+            'is_fresh_lead': df.get('is_fresh_lead', False),
+            'crm_record': crm_record.notna() & (crm_record.astype(str).str.lower() == 'yes'),
+            'conversation_duration': pd.to_numeric(df['Conversation duration'], errors='coerce').fillna(0).astype(int),
+            'initial_response_time': pd.to_numeric(df['Initial response time'], errors='coerce').fillna(0).astype(int),
+            'average_response_time': pd.to_numeric(df['Average response time'], errors='coerce').fillna(0).astype(int)
+        }, index=df.index)
+        return self._bulk_insert(ChatRecord, 'chat_id', records, batch_size, self._after_chat_insert)
+
+    def _bulk_insert(self, model, key, records, batch_size, after_insert):
+        """Insert a frame of column values in multi-row batches, skipping existing keys.
+
+        after_insert updates the rollups and fresh-lead tags for the rows that
+        were actually inserted, in the same transaction, so they never count a
+        conflicting duplicate.
+        """
+        # Convert to plain Python values once, with missing values as NULL
+        values = records.astype(object).where(records.notna(), None)
+        rows = values.to_dict('records')
+        stmt = self._insert_statement(model, key)
+
+        inserted = 0
         with self.session_scope() as session:
-            for _, row in df.iterrows():
-                stmt = insert(CallRecord).values(
-                    call_id=row['ID'],
-                    timestamp=pd.to_datetime(row['Time']),
-                    call_from=row['Call From'],
-                    call_to=row['Call To'],
-                    duration=float(row['Call Duration']) if pd.notna(row['Call Duration']) else 0.0,
-                    ring_duration=float(row['Ring Duration']) if pd.notna(row['Ring Duration']) else 0.0,
-                    talk_duration=float(row['Talk Duration']) if pd.notna(row['Talk Duration']) else 0.0,
-                    status=row['Status'],
-                    recording_file=str(row['Recording File']) if pd.notna(row['Recording File']) else None,
-                    call_date=pd.to_datetime(row['Time']).date(),
-                    is_fresh_lead=row.get('is_fresh_lead', False),
-                    source=row.get('Source Trunk'),
-                    communication_type=row.get('Communication Type')
+            for start in range(0, len(rows), batch_size):
+                inserted_keys = self._insert_new(session, stmt, model, key, rows[start:start + batch_size])
+                inserted += len(inserted_keys)
+
+                batch_records = records.iloc[start:start + batch_size]
+                # A key repeated within the batch was inserted once, so it is counted once
+                new_records = batch_records[batch_records[key].isin(inserted_keys)].drop_duplicates(subset=key, keep='first')
+                if not new_records.empty:
+                    after_insert(session, new_records)
+
+        return {'inserted': inserted, 'skipped': len(rows) - inserted}
+
+    def _insert_statement(self, model, key):
+        """One INSERT for every batch, so it is compiled once and executed with executemany parameters"""
+        if self.upsert_insert is None:
+            return model.__table__.insert()
+
+        # SQLAlchemy sends executemany with RETURNING as multi-row VALUES pages and collects the returned keys
+        key_column = model.__table__.c[key]
+        return self.upsert_insert(model.__table__).on_conflict_do_nothing(index_elements=[key]).returning(key_column)
+
+    def _insert_new(self, session, stmt, model, key, rows):
+        """Insert the rows whose key is not stored yet and return the inserted keys"""
+        if self.upsert_insert is not None:
+            return session.execute(stmt, rows).scalars().all()
+
+        # Without ON CONFLICT (SQL Server), drop stored and repeated keys, then executemany
+        key_column = getattr(model, key)
+        stored = set(session.execute(
+            select(key_column).where(key_column.in_([row[key] for row in rows]))
+        ).scalars())
+
+        new_rows = {}
+        for row in rows:
+            if row[key] not in stored:
+                new_rows.setdefault(row[key], row)
+
+        if new_rows:
+            session.execute(stmt, list(new_rows.values()))
+        return list(new_rows)
+
+    def _upsert_rollups(self, session, model, keys, totals):
+        """Add per-key totals onto the existing rollup rows"""
+        totals = totals.reset_index()
+        rows = totals.astype(object).to_dict('records')
+        sums = [column for column in totals.columns if column not in keys]
+
+        if self.upsert_insert is not None:
+            # Rows go in as executemany parameters, so the statement compiles once per rollup table
+            table = model.__table__
+            stmt = self.upsert_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=keys,
+                set_={column: table.c[column] + stmt.excluded[column] for column in sums}
+            )
+            session.execute(stmt, rows)
+            return
+
+        # Rollup batches are small (one row per day and key), so update-then-insert per row is fine
+        for row in rows:
+            stmt = (
+                update(model)
+                .where(*[getattr(model, key) == row[key] for key in keys])
+                .values({column: getattr(model, column) + row[column] for column in sums})
+            )
+            if session.execute(stmt).rowcount == 0:
+                session.execute(model.__table__.insert().values(row))
+
+    def _after_call_insert(self, session, records):
+        self._update_call_rollups(session, records)
+
+        # An upload's lead index only holds its own chats; earlier stored chats can tag these calls or change their channel
+        self._retag_fresh_leads(session, records['call_to'], records['call_date'])
+
+    def _after_chat_insert(self, session, records):
+        self._update_chat_rollups(session, records)
+
+        # Calls stored before this chat arrived are tagged now
+        self._retag_fresh_leads(session, records['phone_number'], records['lead_date'])
+
+    def _retag_fresh_leads(self, session, phones, dates):
+        """Tag stored calls that match a stored chat lead on (call_to, call_date) with that chat's channel.
+
+        Only calls to the given numbers within the span of the given dates are
+        revisited. A matched call takes the channel of the earliest stored
+        matching chat as its lead_channel, and moves between call rollup rows to match.
+        """
+        candidates = pd.DataFrame({'phone': phones, 'date': dates}).dropna()
+        if candidates.empty:
+            return
+
+        matches_lead = [ChatRecord.phone_number == CallRecord.call_to, ChatRecord.lead_date == CallRecord.call_date]
+        first_channel = (
+            select(ChatRecord.channel).where(*matches_lead).order_by(ChatRecord.id).limit(1).scalar_subquery()
+        )
+        stmt = (
+            select(
+                CallRecord.id, CallRecord.call_date, CallRecord.source, CallRecord.lead_channel, CallRecord.status,
+                CallRecord.duration, CallRecord.is_fresh_lead, first_channel.label('channel')
+            )
+            .where(
+                CallRecord.call_to.in_(candidates['phone'].unique().tolist()),
+                *_date_range(CallRecord.call_date, candidates['date'].min(), candidates['date'].max()),
+                select(ChatRecord.id).where(*matches_lead).exists(),
+                or_(
+                    CallRecord.is_fresh_lead == False,
+                    func.coalesce(CallRecord.lead_channel, '') != func.coalesce(first_channel, '')
                 )
-                stmt = stmt.on_conflict_do_nothing(index_elements=['call_id'])
-                session.execute(stmt)
-            session.commit()
+            )
+        )
+
+        with span('retag_fresh_leads') as current:
+            retagged = pd.DataFrame(
+                session.execute(stmt).all(),
+                columns=['id', 'call_date', 'source', 'lead_channel', 'status', 'duration', 'is_fresh_lead', 'channel']
+            )
+            current.rows = len(retagged)
+            if retagged.empty:
+                return
+
+            session.execute(update(CallRecord), [
+                {'id': row.id, 'is_fresh_lead': True, 'lead_channel': row.channel}
+                for row in retagged.astype(object).itertuples(index=False)
+            ])
+
+            # Take each call out of its old rollup row and add it to its fresh-lead one
+            answered = (retagged['status'] == 'ANSWERED').astype(int)
+            duration = retagged['duration'].fillna(0.0)
+            removed = pd.DataFrame({
+                'call_date': retagged['call_date'],
+                'source': retagged['source'].fillna(''),
+                'lead_channel': retagged['lead_channel'].fillna(''),
+                'call_count': -1,
+                'answered_count': -answered,
+                'fresh_lead_count': -retagged['is_fresh_lead'].astype(int),
+                'duration_sum': -duration
+            })
+            added = removed.assign(
+                lead_channel=retagged['channel'].fillna(''),
+                call_count=1,
+                answered_count=answered,
+                fresh_lead_count=1,
+                duration_sum=duration
+            )
+            totals = pd.concat([removed, added]).groupby(CALL_ROLLUP_KEYS).sum()
+            self._upsert_rollups(session, DailyCallRollup, CALL_ROLLUP_KEYS, totals)
+
+    def _update_call_rollups(self, session, records):
+        calls = pd.DataFrame({
+            'call_date': records['call_date'],
+            'source': records['source'].fillna(''),
+            'lead_channel': records['lead_channel'].fillna(''),
+            'answered': records['status'] == 'ANSWERED',
+            'fresh': records['is_fresh_lead'].astype(bool),
+            'duration': records['duration']
+        }).dropna(subset=['call_date'])
+        if calls.empty:
+            return
+
+        totals = calls.groupby(CALL_ROLLUP_KEYS).agg(
+            call_count=('answered', 'size'),
+            answered_count=('answered', 'sum'),
+            fresh_lead_count=('fresh', 'sum'),
+            duration_sum=('duration', 'sum')
+        )
+        self._upsert_rollups(session, DailyCallRollup, CALL_ROLLUP_KEYS, totals)
+
+    def _update_chat_rollups(self, session, records):
+        chats = pd.DataFrame({
+            'lead_date': records['lead_date'],
+            'channel': records['channel'].fillna(''),
+            'employee': records['employee'].fillna(''),
+            'messages': records['messages'],
+            'response_time': records['response_time'],
+            'conversation_duration': records['conversation_duration']
+        }).dropna(subset=['lead_date'])
+        if chats.empty:
+            return
+
+        totals = chats.groupby(['lead_date', 'channel', 'employee']).agg(
+            chat_count=('messages', 'size'),
+            messages_sum=('messages', 'sum'),
+            response_time_sum=('response_time', 'sum'),
+            response_time_count=('response_time', 'count'),
+            conversation_duration_sum=('conversation_duration', 'sum')
+        )
+        self._upsert_rollups(session, DailyChatRollup, ['lead_date', 'channel', 'employee'], totals)
+
+    @instrumented()
+    def rebuild_rollups(self):
+        """Recompute both rollup tables from the raw call and chat records"""
+        source = func.coalesce(CallRecord.source, '')
+        lead_channel = func.coalesce(CallRecord.lead_channel, '')
+        calls = (
+            select(
+                CallRecord.call_date,
+                source,
+                lead_channel,
+                func.count(CallRecord.id),
+                func.sum(case((CallRecord.status == 'ANSWERED', 1), else_=0)),
+                func.sum(case((CallRecord.is_fresh_lead == True, 1), else_=0)),
+                func.coalesce(func.sum(CallRecord.duration), 0.0)
+            )
+            .where(CallRecord.call_date.isnot(None))
+            .group_by(CallRecord.call_date, source, lead_channel)
+        )
+
+        channel = func.coalesce(ChatRecord.channel, '')
+        employee = func.coalesce(ChatRecord.employee, '')
+        chats = (
+            select(
+                ChatRecord.lead_date,
+                channel,
+                employee,
+                func.count(ChatRecord.id),
+                func.coalesce(func.sum(ChatRecord.messages), 0),
+                func.coalesce(func.sum(ChatRecord.response_time), 0.0),
+                func.count(ChatRecord.response_time),
+                func.coalesce(func.sum(ChatRecord.conversation_duration), 0)
+            )
+            .where(ChatRecord.lead_date.isnot(None))
+            .group_by(ChatRecord.lead_date, channel, employee)
+        )
 
-    def store_chat_records(self, df):
-        """Store chat records with enhanced metrics"""
         with self.session_scope() as session:
-            for _, row in df.iterrows():
-                stmt = insert(ChatRecord).values(
-                    chat_id=str(row['#']),
-                    type=row['Type'],
-                    status=row['Status'],
-                    channel=row['Channel'],
-                    client=row['Client'],
-                    messages=int(row['Messages']) if pd.notna(row['Messages']) else 0,
-                    employee=row['Employee'],
-                    created_on=pd.to_datetime(row['Created on']),
-                    closed_on=pd.to_datetime(row['Agent closed on']) if pd.notna(row['Agent closed on']) else None,
-                    response_time=float(row['Total response time']) if pd.notna(row['Total response time']) else 0.0,
-                    lead_date=pd.to_datetime(row['Created on']).date(),
-                    phone_number=str(row['Client']),
-                    is_fresh_lead=row.get('is_fresh_lead', False),
-                    crm_record=row['CRM record'].lower() == 'yes' if pd.notna(row['CRM record']) else False,
-                    conversation_duration=int(row['Conversation duration']) if pd.notna(row['Conversation duration']) else 0,
-                    initial_response_time=int(row['Initial response time']) if pd.notna(row['Initial response time']) else 0,
-                    average_response_time=int(row['Average response time']) if pd.notna(row['Average response time']) else 0
+            session.execute(delete(DailyCallRollup))
+            session.execute(delete(DailyChatRollup))
+            session.execute(DailyCallRollup.__table__.insert().from_select(
+                ['call_date', 'source', 'lead_channel', 'call_count', 'answered_count', 'fresh_lead_count', 'duration_sum'],
+                calls
+            ))
+            session.execute(DailyChatRollup.__table__.insert().from_select(
+                ['lead_date', 'channel', 'employee', 'chat_count', 'messages_sum',
+                 'response_time_sum', 'response_time_count', 'conversation_duration_sum'],
+                chats
+            ))
+
+    def get_ingested_file(self, digest):
+        """Return the ledger entry for a file with this content digest, or None"""
+        with self.session_scope() as session:
+            entry = session.execute(
+                select(IngestedFile).where(IngestedFile.digest == digest)
+            ).scalar_one_or_none()
+            if entry is None:
+                return None
+            return {
+                'file_type': entry.file_type,
+                'file_name': entry.file_name,
+                'row_count': entry.row_count,
+                'first_date': entry.first_date,
+                'last_date': entry.last_date,
+                'ingested_at': entry.ingested_at
+            }
+
+    def record_ingested_file(self, digest, file_type, file_name, chunks, first_date=None, last_date=None):
+        """Add a file to the ingestion ledger with the key range of each of its chunks"""
+        with self.session_scope() as session:
+            session.add(IngestedFile(
+                digest=digest,
+                file_type=file_type,
+                file_name=file_name,
+                row_count=sum(chunk['row_count'] for chunk in chunks),
+                first_date=first_date,
+                last_date=last_date,
+                chunks=[IngestedChunk(chunk_index=index, **chunk) for index, chunk in enumerate(chunks)]
+            ))
+
+    def create_job(self, file_names, total_rows, owner=None):
+        """Queue a background ingestion job for a runner and return its id"""
+        with self.session_scope() as session:
+            job = IngestJob(file_names=file_names, total_rows=total_rows, owner=owner, heartbeat_at=datetime.utcnow())
+            session.add(job)
+            session.flush()
+            return job.id
+
+    def update_job(self, job_id, **values):
+        """Set columns of a job, returning whether cancellation has been requested for it"""
+        with self.session_scope() as session:
+            session.execute(update(IngestJob).where(IngestJob.id == job_id).values(**values))
+            return session.execute(
+                select(IngestJob.cancel_requested).where(IngestJob.id == job_id)
+            ).scalar_one()
+
+    def get_jobs(self, limit=10):
+        """Return the most recent jobs, newest first"""
+        columns = [column.name for column in IngestJob.__table__.columns]
+        with self.session_scope() as session:
+            jobs = session.execute(
+                select(IngestJob).order_by(IngestJob.id.desc()).limit(limit)
+            ).scalars()
+            return [{column: getattr(job, column) for column in columns} for job in jobs]
+
+    def touch_jobs(self, owner):
+        """Record that the runner owning its queued and running jobs is still alive"""
+        with self.session_scope() as session:
+            session.execute(
+                update(IngestJob)
+                .where(IngestJob.owner == owner, IngestJob.status.in_(['queued', 'running']))
+                .values(heartbeat_at=datetime.utcnow())
+            )
+
+    def fail_interrupted_jobs(self, stale_before):
+        """Mark queued or running jobs whose runner last reported before stale_before as failed"""
+        with self.session_scope() as session:
+            session.execute(
+                update(IngestJob)
+                .where(
+                    IngestJob.status.in_(['queued', 'running']),
+                    or_(IngestJob.heartbeat_at.is_(None), IngestJob.heartbeat_at < stale_before)
                 )
-                stmt = stmt.on_conflict_do_nothing(index_elements=['chat_id'])
-                session.execute(stmt)
-            session.commit()
+                .values(status='failed', error='Interrupted: its runner stopped', finished_at=datetime.utcnow())
+            )
+
+    @instrumented()
+    def existing_keys(self, file_type, keys, batch_size=DEFAULT_BATCH_SIZE):
+        """Return the subset of record keys that are already stored"""
+        key_column = RECORD_KEYS[file_type]
+        keys = pd.unique(pd.Series(keys, dtype=object).dropna())
+
+        found = set()
+        with self.session_scope() as session:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size].tolist()
+                found.update(session.execute(select(key_column).where(key_column.in_(batch))).scalars())
+        return found
+
+    def _record_filters(self, file_type, filters):
+        """WHERE conditions for the explorer filters: start, end, statuses, channels, employees and phone"""
+        columns = EXPLORER_COLUMNS[file_type]
+        filters = filters or {}
+        conditions = _date_range(columns['date'], filters.get('start'), filters.get('end'))
+        if filters.get('statuses'):
+            conditions.append(columns['model'].status.in_(filters['statuses']))
+        if filters.get('channels'):
+            conditions.append(columns['channel'].in_(filters['channels']))
+        if filters.get('employees') and columns['employee'] is not None:
+            conditions.append(columns['employee'].in_(filters['employees']))
+        if filters.get('phone'):
+            # Stored numbers are standardized, so a standardized prefix can use the phone index
+            conditions.append(columns['phone'].startswith(_phone_prefix(filters['phone']), autoescape=True))
+        return conditions
+
+    @instrumented()
+    def count_records(self, file_type, filters=None):
+        """Count the stored records of one type matching the explorer filters"""
+        model = EXPLORER_COLUMNS[file_type]['model']
+        stmt = select(func.count(model.id)).where(*self._record_filters(file_type, filters))
+        with self.session_scope() as session:
+            return session.execute(stmt).scalar()
+
+    @instrumented()
+    def get_records_page(self, file_type, filters=None, sort='Date', descending=True, page=1, page_size=50):
+        """Fetch one page of stored records of one type, filtered and sorted in SQL"""
+        columns = EXPLORER_COLUMNS[file_type]
+        model = columns['model']
+        sort_column = columns['sort'][sort]
+        order = [sort_column.desc(), model.id.desc()] if descending else [sort_column, model.id]
+
+        stmt = (
+            select(*[column for column in model.__table__.columns if column.name != 'id'])
+            .where(*self._record_filters(file_type, filters))
+            .order_by(*order)  # id breaks ties so pages never overlap
+            .limit(page_size)
+            .offset((max(page, 1) - 1) * page_size)
+        )
+        with self.session_scope() as session:
+            result = session.execute(stmt)
+            return pd.DataFrame(result.all(), columns=list(result.keys()))
+
+    def get_filter_options(self):
+        """Distinct statuses, channels and employees to offer as explorer filters"""
+        with self.session_scope() as session:
+            def values(column):
+                return [value for value in session.execute(select(distinct(column)).order_by(column)).scalars() if value]
+
+            return {
+                'call_statuses': values(CallRecord.status),
+                'call_sources': values(DailyCallRollup.source),
+                'chat_statuses': values(ChatRecord.status),
+                'channels': values(DailyChatRollup.channel),
+                'employees': values(DailyChatRollup.employee)
+            }
 
     def get_analytics_data(self):
         """Retrieve analytics data for visualizations"""
@@ -95,4 +568,191 @@ class DatabaseOperations:
             return {
                 'call_stats': call_stats,
                 'chat_stats': chat_stats
-            }
\ No newline at end of file
+            }
+
+    @instrumented()
+    def get_fresh_leads_by_date(self, start=None, end=None):
+        """Count fresh leads per call date and the channel of the chat lead they matched"""
+        count = func.sum(DailyCallRollup.fresh_lead_count)
+        stmt = (
+            select(DailyCallRollup.call_date.label('lead_date'), DailyCallRollup.lead_channel, count.label('count'))
+            .where(
+                DailyCallRollup.fresh_lead_count > 0,
+                DailyCallRollup.lead_channel != '',
+                *_date_range(DailyCallRollup.call_date, start, end)
+            )
+            .group_by(DailyCallRollup.call_date, DailyCallRollup.lead_channel)
+            .order_by(DailyCallRollup.call_date, DailyCallRollup.lead_channel)
+        )
+        with self.session_scope() as session:
+            rows = session.execute(stmt).all()
+        return pd.DataFrame(rows, columns=['lead_date', 'source', 'count'])
+
+    @instrumented()
+    def get_channel_counts(self, start=None, end=None):
+        """Count conversations per channel"""
+        count = func.sum(DailyChatRollup.chat_count)
+        stmt = (
+            select(DailyChatRollup.channel, count)
+            .where(DailyChatRollup.channel != '', *_date_range(DailyChatRollup.lead_date, start, end))
+            .group_by(DailyChatRollup.channel)
+            .order_by(count.desc())
+        )
+        with self.session_scope() as session:
+            rows = session.execute(stmt).all()
+        return pd.Series(
+            [row[1] for row in rows],
+            index=pd.Index([row[0] for row in rows], name='Channel'),
+            name='count',
+            dtype='int64'
+        )
+
+    @instrumented()
+    def get_funnel_counts(self, start=None, end=None):
+        """Count distinct leads, contacted leads and answered leads"""
+        total_stmt = (
+            select(func.count(distinct(ChatRecord.phone_number)))
+            .where(*_date_range(ChatRecord.lead_date, start, end))
+        )
+        calls_stmt = (
+            select(
+                func.count(distinct(CallRecord.call_to)),
+                func.count(distinct(case((CallRecord.status == 'ANSWERED', CallRecord.call_to))))
+            )
+            .where(*_date_range(CallRecord.call_date, start, end))
+        )
+        with self.session_scope() as session:
+            total_leads = session.execute(total_stmt).scalar()
+            contacted_leads, answered_calls = session.execute(calls_stmt).one()
+        return {
+            'total_leads': total_leads,
+            'contacted_leads': contacted_leads,
+            'answered_calls': answered_calls
+        }
+
+    @instrumented()
+    def get_conversion_by_source(self, start=None, end=None):
+        """Share of each channel's distinct leads that had an answered call"""
+        answered = (
+            select(CallRecord.call_to)
+            .where(CallRecord.status == 'ANSWERED', *_date_range(CallRecord.call_date, start, end))
+            .distinct()
+            .subquery()
+        )
+        stmt = (
+            select(
+                ChatRecord.channel,
+                func.count(distinct(ChatRecord.phone_number)),
+                func.count(distinct(answered.c.call_to))
+            )
+            .outerjoin(answered, ChatRecord.phone_number == answered.c.call_to)
+            .where(ChatRecord.channel.isnot(None), *_date_range(ChatRecord.lead_date, start, end))
+            .group_by(ChatRecord.channel)
+        )
+        with self.session_scope() as session:
+            rows = session.execute(stmt).all()
+        return pd.DataFrame(
+            [
+                {'source': channel, 'conversion_rate': converted / total * 100 if total > 0 else 0}
+                for channel, total, converted in rows
+            ],
+            columns=['source', 'conversion_rate']
+        )
+
+    @instrumented()
+    def get_agent_performance(self, start=None, end=None):
+        """Mean messages, response time and conversation duration per employee"""
+        chat_count = func.sum(DailyChatRollup.chat_count)
+        stmt = (
+            select(
+                DailyChatRollup.employee,
+                func.sum(DailyChatRollup.messages_sum) * 1.0 / chat_count,
+                func.sum(DailyChatRollup.response_time_sum) / func.nullif(func.sum(DailyChatRollup.response_time_count), 0),
+                func.sum(DailyChatRollup.conversation_duration_sum) * 1.0 / chat_count
+            )
+            .where(DailyChatRollup.employee != '', *_date_range(DailyChatRollup.lead_date, start, end))
+            .group_by(DailyChatRollup.employee)
+            .order_by(DailyChatRollup.employee)
+        )
+        with self.session_scope() as session:
+            rows = session.execute(stmt).all()
+        agent_stats = pd.DataFrame(
+            [row[1:] for row in rows],
+            index=pd.Index([row[0] for row in rows], name='Employee'),
+            columns=AGENT_COLUMNS,
+            dtype='float64'
+        )
+        return agent_stats.round(2)
+
+    @instrumented()
+    def get_response_time_bins(self, start=None, end=None, bin_width=RESPONSE_TIME_BIN_WIDTH):
+        """Histogram of chat response times in fixed-width bins"""
+        bin_start = (func.floor(ChatRecord.response_time / bin_width) * bin_width).label('bin_start')
+        stmt = (
+            select(bin_start, func.count(ChatRecord.id))
+            .where(ChatRecord.response_time.isnot(None), *_date_range(ChatRecord.lead_date, start, end))
+            .group_by(bin_start)
+            .order_by(bin_start)
+        )
+        with self.session_scope() as session:
+            rows = session.execute(stmt).all()
+        return pd.DataFrame(rows, columns=['bin_start', 'count'])
+
+    @instrumented()
+    def get_key_metrics(self, start=None, end=None):
+        """Headline numbers shown under the dashboard charts"""
+        leads_stmt = (
+            select(func.count(distinct(ChatRecord.phone_number)))
+            .where(*_date_range(ChatRecord.lead_date, start, end))
+        )
+        response_stmt = (
+            select(
+                func.sum(DailyChatRollup.response_time_sum)
+                / func.nullif(func.sum(DailyChatRollup.response_time_count), 0)
+            )
+            .where(*_date_range(DailyChatRollup.lead_date, start, end))
+        )
+        fresh_stmt = (
+            select(func.count(distinct(CallRecord.call_to)))
+            .where(CallRecord.is_fresh_lead == True, *_date_range(CallRecord.call_date, start, end))
+        )
+        with self.session_scope() as session:
+            total_leads = session.execute(leads_stmt).scalar()
+            avg_response_time = session.execute(response_stmt).scalar()
+            fresh_leads = session.execute(fresh_stmt).scalar()
+        return {
+            'total_leads': total_leads,
+            'fresh_leads': fresh_leads,
+            'avg_response_time': float(avg_response_time) if avg_response_time is not None else float('nan'),
+            'conversion_rate': fresh_leads / total_leads * 100 if total_leads > 0 else 0
+        }
+
+
+class DatabaseAggregates:
+    """Dashboard aggregates read from the stored records for an optional date range"""
+
+    def __init__(self, db_ops, start=None, end=None):
+        self.db_ops = db_ops
+        self.start = start
+        self.end = end
+
+    def fresh_leads_by_date(self):
+        return self.db_ops.get_fresh_leads_by_date(self.start, self.end)
+
+    def channel_counts(self):
+        return self.db_ops.get_channel_counts(self.start, self.end)
+
+    def funnel_counts(self):
+        return self.db_ops.get_funnel_counts(self.start, self.end)
+
+    def conversion_by_source(self):
+        return self.db_ops.get_conversion_by_source(self.start, self.end)
+
+    def agent_performance(self):
+        return self.db_ops.get_agent_performance(self.start, self.end)
+
+    def response_time_bins(self):
+        return self.db_ops.get_response_time_bins(self.start, self.end)
+
+    def key_metrics(self):
+        return self.db_ops.get_key_metrics(self.start, self.end)
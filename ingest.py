@@ -0,0 +1,145 @@
+"""Load call and chat exports into the database without the dashboard.
+
+Run from the repository root with any mix of files, directories and globs;
+each file is recognised as a call or chat export from its header:
+
+    python -m ingest exports/2025-01/ extra/calls_*.csv
+    python -m ingest --workers 8 exports/
+    python -m ingest --dry-run calls.csv chats.csv
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from database.models import init_db
+from database.operations import DatabaseOperations
+from utils.data_processor import DataProcessor
+from utils.parallel import parallel_ingest
+from utils.pipeline import (
+    DEFAULT_CHUNK_SIZE, detect_file_type, ingest_file_chunks, new_ingest_summary, read_csv_chunks
+)
+
+
+def collect_files(paths):
+    """Expand files, directories and glob patterns into sorted call and chat CSV lists"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(glob.glob(os.path.join(path, '*.csv')))
+        elif glob.has_magic(path):
+            found.extend(glob.glob(path))
+        else:
+            found.append(path)
+
+    files = {'call': [], 'chat': []}
+    for path in sorted(set(found)):
+        file_type = detect_file_type(path)
+        if file_type is None:
+            print(f"Skipping {path}: not a call or chat export", file=sys.stderr)
+        else:
+            files[file_type].append(path)
+    return files
+
+
+class Progress:
+    """Running row counts and throughput, redrawn on one stderr line"""
+
+    def __init__(self):
+        self.rows = {'call': 0, 'chat': 0}
+        self.started = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def update(self, file_type, rows):
+        self.rows[file_type] += rows
+        total = sum(self.rows.values())
+        print(
+            f"\r{self.rows['chat']:,} chats, {self.rows['call']:,} calls processed, "
+            f"{total / max(self.elapsed(), 1e-9):,.0f} rows/s",
+            end='', file=sys.stderr, flush=True
+        )
+
+
+def dry_run(files, chunksize, progress):
+    """Read and process every file without touching the database"""
+    lead_indexes = []
+    for path in files['chat']:
+        for chunk in read_csv_chunks(path, chunksize):
+            lead_indexes.append(DataProcessor.build_lead_index(chunk))
+            DataProcessor.process_chat_data(chunk)
+            progress.update('chat', len(chunk))
+
+    lead_index = DataProcessor.merge_lead_indexes(lead_indexes) if lead_indexes else None
+    for path in files['call']:
+        for chunk in read_csv_chunks(path, chunksize):
+            DataProcessor.process_call_data(chunk, lead_index=lead_index)
+            progress.update('call', len(chunk))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', help='CSV files, directories of CSV files or glob patterns')
+    parser.add_argument(
+        '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+        help='rows read per chunk when ingesting in one process (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='processes to parse files in; above 1 each file is processed whole in a worker (default: %(default)s)'
+    )
+    parser.add_argument('--dry-run', action='store_true', help='process the files without storing anything')
+    parser.add_argument('--database-url', help='overrides DATABASE_URL')
+    args = parser.parse_args()
+
+    files = collect_files(args.paths)
+    if not files['call'] and not files['chat']:
+        parser.error('no call or chat exports found')
+    print(f"Found {len(files['call'])} call and {len(files['chat'])} chat files", file=sys.stderr)
+
+    progress = Progress()
+    if args.dry_run:
+        dry_run(files, args.chunk_size, progress)
+        print(file=sys.stderr)
+        rows = sum(progress.rows.values())
+        print(f"Dry run: processed {rows:,} rows in {progress.elapsed():.1f}s "
+              f"({rows / max(progress.elapsed(), 1e-9):,.0f} rows/s), nothing stored")
+        return
+
+    db_ops = DatabaseOperations(init_db(args.database_url))
+    if args.workers > 1:
+        summary = parallel_ingest(
+            [(path, path) for path in files['call']],
+            [(path, path) for path in files['chat']],
+            db_ops, workers=args.workers
+        )
+    else:
+        summary = new_ingest_summary()
+        for file_type, processed in ingest_file_chunks(
+            files['call'], files['chat'], db_ops, summary, args.chunk_size
+        ):
+            progress.update(file_type, len(processed))
+        print(file=sys.stderr)
+
+    elapsed = progress.elapsed()
+    if summary['already_ingested']:
+        print("All files were already ingested, nothing to do")
+    print(
+        f"Calls: {summary['calls']['inserted']:,} new, {summary['calls']['skipped']:,} already stored\n"
+        f"Chats: {summary['chats']['inserted']:,} new, {summary['chats']['skipped']:,} already stored\n"
+        f"Dates: {summary['first_date']} to {summary['last_date']}"
+    )
+
+    # Throughput covers only rows that were read; files skipped through the ledger never are
+    rows = sum(summary[kind][count] for kind in ('calls', 'chats') for count in ('inserted', 'skipped'))
+    rows -= summary['ledger_skipped']
+    if rows:
+        print(f"Took {elapsed:.1f}s, {rows / max(elapsed, 1e-9):,.0f} rows/s")
+    else:
+        print(f"Took {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
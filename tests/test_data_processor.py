@@ -0,0 +1,115 @@
+import pandas as pd
+import pytest
+
+from utils.data_processor import DataProcessor
+from utils.phone_utils import standardize_phone_number
+
+
+def reference_fresh_leads(calls, chats):
+    """The per-call scan process_call_data used before the merge, kept as the parity reference"""
+    calls = calls.copy()
+    chats = chats.copy()
+    calls['Call To'] = calls['Call To'].apply(lambda x: standardize_phone_number(str(x)))
+    calls['lead_date'] = pd.to_datetime(calls['Time']).dt.date
+    calls['is_fresh_lead'] = False
+    calls['source'] = None
+
+    chats['lead_date'] = pd.to_datetime(chats['Created on']).dt.date
+    chats['phone_number'] = chats['Client'].apply(lambda x: standardize_phone_number(str(x)))
+
+    for idx, row in calls.iterrows():
+        matching_lead = chats[
+            (chats['phone_number'] == row['Call To']) &
+            (chats['lead_date'] == row['lead_date'])
+        ]
+        if not matching_lead.empty:
+            calls.at[idx, 'is_fresh_lead'] = True
+            calls.at[idx, 'source'] = matching_lead.iloc[0]['Channel']
+
+    return calls[['is_fresh_lead', 'source']]
+
+
+def make_calls(rows):
+    calls = pd.DataFrame(rows, columns=['ID', 'Call To', 'Time'])
+    calls['Call From'] = '<100>'
+    calls['Call Duration'] = 10
+    calls['Ring Duration'] = 2
+    calls['Talk Duration'] = 8
+    return calls
+
+
+def make_chats(rows):
+    return pd.DataFrame(rows, columns=['Client', 'Created on', 'Channel'])
+
+
+def assert_parity(calls, chats):
+    expected = reference_fresh_leads(calls, chats)
+    processed = DataProcessor.process_call_data(calls, existing_leads_df=chats)
+
+    assert processed['is_fresh_lead'].tolist() == expected['is_fresh_lead'].tolist()
+    actual_sources = [None if pd.isna(source) else source for source in processed['source']]
+    assert actual_sources == expected['source'].tolist()
+    return processed
+
+
+def test_first_chat_channel_wins():
+    calls = make_calls([
+        ('c1', '201001234567', '2025-01-02 09:00'),
+        ('c2', '201001234567', '2025-01-02 17:30'),
+        ('c3', '201001234567', '2025-01-03 09:00'),
+    ])
+    chats = make_chats([
+        ('201001234567', '2025-01-02 08:00', 'WhatsApp'),
+        ('201001234567', '2025-01-02 08:30', 'Facebook'),
+        ('201001234567', '2025-01-02 12:00', 'Web'),
+    ])
+
+    processed = assert_parity(calls, chats)
+    assert list(processed['source'].astype(object)[:2]) == ['WhatsApp', 'WhatsApp']
+    assert not processed['is_fresh_lead'].iloc[2]
+
+
+def test_chats_without_created_on_never_match():
+    calls = make_calls([
+        ('c1', '201001234567', '2025-01-02 09:00'),
+        ('c2', '201112223334', '2025-01-02 09:00'),
+        ('c3', '201112223334', None),
+    ])
+    chats = make_chats([
+        ('201001234567', None, 'WhatsApp'),
+        ('201112223334', pd.NaT, 'Web'),
+        ('201112223334', '2025-01-02 08:00', 'Facebook'),
+    ])
+
+    processed = assert_parity(calls, chats)
+    assert processed['is_fresh_lead'].tolist() == [False, True, False]
+
+
+@pytest.mark.parametrize('call_to, client', [
+    ('<142>01001234567', '01001234567'),
+    ('+201001234567', '<7>201001234567'),
+    ('01001234567', '+2 0100 123 4567'),
+    ('+2 (0100) 123-4567', '<Mobile> 201001234567'),
+])
+def test_phone_formats_match_after_standardizing(call_to, client):
+    calls = make_calls([('c1', call_to, '2025-01-02 09:00'), ('c2', '201009999999', '2025-01-02 09:00')])
+    chats = make_chats([(client, '2025-01-02 08:00', 'Web')])
+
+    processed = assert_parity(calls, chats)
+    assert processed['is_fresh_lead'].tolist() == [True, False]
+
+
+def test_matches_reference_on_mixed_exports():
+    phones = ['01001234567', '+201001234567', '<3>201112223334', '201112223334', '01228887776', '201550001112']
+    channels = ['WhatsApp', 'Facebook', 'Web', 'Instagram']
+    calls = make_calls([
+        (f'c{i}', phones[i % len(phones)], f'2025-01-0{1 + i % 4} {8 + i % 9}:00')
+        for i in range(60)
+    ])
+    chats = make_chats([
+        (phones[(i * 5) % len(phones)], f'2025-01-0{1 + i % 3} {7 + i % 5}:15', channels[i % len(channels)])
+        for i in range(25)
+    ])
+
+    processed = assert_parity(calls, chats)
+    assert processed['is_fresh_lead'].any() and not processed['is_fresh_lead'].all()
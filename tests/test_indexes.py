@@ -0,0 +1,114 @@
+import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import UniqueConstraint, create_engine, event, inspect
+from sqlalchemy.dialects import mssql
+
+from database.migrations import apply_indexes
+from database.models import Base
+from database.operations import DatabaseOperations
+
+DAY = datetime.date(2025, 1, 1)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db_ops(engine):
+    return DatabaseOperations(engine)
+
+
+def query_plans(engine, run):
+    """EXPLAIN QUERY PLAN details of every SELECT that run() sends to the database"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        run()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+    with engine.connect() as connection:
+        return [
+            ' | '.join(row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters))
+            for statement, parameters in statements
+        ]
+
+
+def assert_uses(plans, *indexes):
+    """Each index must appear in a plan; a tuple lists indexes the planner may choose between"""
+    for choices in indexes:
+        choices = choices if isinstance(choices, tuple) else (choices,)
+        assert any(f'INDEX {index}' in plan for plan in plans for index in choices), f'{choices} not used in {plans}'
+
+
+def test_funnel_counts_use_phone_indexes(engine, db_ops):
+    plans = query_plans(engine, db_ops.get_funnel_counts)
+    # Either index covers the distinct chat phone numbers
+    assert_uses(
+        plans,
+        ('ix_chat_records_phone_number_lead_date', 'ix_chat_records_channel_phone_number'),
+        'ix_call_records_status_call_to'
+    )
+
+
+def test_funnel_counts_for_a_date_range_use_date_indexes(engine, db_ops):
+    plans = query_plans(engine, lambda: db_ops.get_funnel_counts(DAY, DAY))
+    assert_uses(plans, 'ix_chat_records_lead_date', 'ix_call_records_call_date_status')
+
+
+def test_conversion_by_source_uses_channel_and_answered_indexes(engine, db_ops):
+    plans = query_plans(engine, lambda: db_ops.get_conversion_by_source(DAY, DAY))
+    assert_uses(plans, 'ix_chat_records_channel_phone_number', 'ix_call_records_status_call_to')
+
+
+def test_fresh_lead_join_uses_phone_and_date_indexes(engine, db_ops):
+    def retag():
+        with db_ops.session_scope() as session:
+            db_ops._retag_fresh_leads(session, pd.Series(['201001234567']), pd.Series([DAY]))
+
+    plans = query_plans(engine, retag)
+    assert_uses(plans, 'ix_call_records_call_to_call_date', 'ix_chat_records_phone_number_lead_date')
+
+
+def test_fresh_lead_count_uses_call_date_index(engine, db_ops):
+    plans = query_plans(engine, lambda: db_ops.get_key_metrics(DAY, DAY))
+    assert_uses(plans, 'ix_call_records_call_date_status')
+
+
+def test_apply_indexes_adds_missing_indexes_to_existing_tables():
+    engine = create_engine('sqlite://')
+    for table in Base.metadata.sorted_tables:
+        table.create(engine)
+        for index in table.indexes:
+            index.drop(engine)
+
+    created = apply_indexes(engine)
+
+    assert 'ix_call_records_call_to_call_date' in created
+    assert 'ix_chat_records_phone_number_lead_date' in created
+    assert {index['name'] for index in inspect(engine).get_indexes('call_records')} >= {
+        'ix_call_records_call_to_call_date', 'ix_call_records_status_call_to', 'ix_call_records_call_date_status'
+    }
+    assert apply_indexes(engine) == []
+
+
+def test_indexed_text_columns_have_a_length_sql_server_can_index():
+    dialect = mssql.dialect()
+    for table in Base.metadata.sorted_tables:
+        keyed = {column for index in table.indexes for column in index.columns}
+        keyed |= {column for constraint in table.constraints if isinstance(constraint, UniqueConstraint)
+                  for column in constraint.columns}
+        keyed |= {column for column in table.columns if column.unique}
+        for column in keyed:
+            assert 'max' not in column.type.compile(dialect=dialect).lower(), f'{table.name}.{column.name}'
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+
+from database.models import Base, DailyCallRollup, DailyChatRollup
+from database.operations import DatabaseOperations
+
+CALL_ROLLUP_COLUMNS = ['call_date', 'source', 'lead_channel', 'call_count', 'answered_count', 'fresh_lead_count', 'duration_sum']
+CHAT_ROLLUP_COLUMNS = [
+    'lead_date', 'channel', 'employee', 'chat_count', 'messages_sum',
+    'response_time_sum', 'response_time_count', 'conversation_duration_sum'
+]
+
+
+@pytest.fixture(params=['upsert', 'without_upsert'])
+def db_ops(request):
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    db_ops = DatabaseOperations(engine)
+    if request.param == 'without_upsert':
+        # The SQL Server path: no ON CONFLICT, so stored and repeated keys are dropped in Python
+        db_ops.upsert_insert = None
+    return db_ops
+
+
+def rollups(db_ops, model, columns):
+    with db_ops.session_scope() as session:
+        rows = session.execute(select(*[getattr(model, column) for column in columns])).all()
+    return sorted(tuple(row) for row in rows)
+
+
+def call_frame(ids):
+    return pd.DataFrame({
+        'ID': ids,
+        'Time': ['2025-01-01 10:00:00'] * len(ids),
+        'Call From': ['100'] * len(ids),
+        'Call To': ['201001234567'] * len(ids),
+        'Call Duration': [10.0, 10.0, 5.0][:len(ids)],
+        'Ring Duration': [1.0] * len(ids),
+        'Talk Duration': [9.0] * len(ids),
+        'Status': ['ANSWERED'] * len(ids),
+        'Recording File': [None] * len(ids),
+        'Source Trunk': ['trunk'] * len(ids)
+    })
+
+
+def chat_frame(ids):
+    return pd.DataFrame({
+        '#': ids,
+        'Type': ['chat'] * len(ids),
+        'Status': ['closed'] * len(ids),
+        'Channel': ['web'] * len(ids),
+        'Client': ['201007654321'] * len(ids),
+        'Messages': [4, 4, 2][:len(ids)],
+        'Employee': ['agent'] * len(ids),
+        'Created on': ['2025-01-01 09:00:00'] * len(ids),
+        'Agent closed on': ['2025-01-01 09:30:00'] * len(ids),
+        'Total response time': [60, 60, 30][:len(ids)],
+        'CRM record': ['yes'] * len(ids),
+        'Conversation duration': [300, 300, 100][:len(ids)],
+        'Initial response time': [5] * len(ids),
+        'Average response time': [15] * len(ids)
+    })
+
+
+def test_call_repeated_within_a_batch_is_rolled_up_once(db_ops):
+    result = db_ops.store_call_records(call_frame(['a', 'a', 'b']))
+
+    assert result == {'inserted': 2, 'skipped': 1}
+    incremental = rollups(db_ops, DailyCallRollup, CALL_ROLLUP_COLUMNS)
+    assert [row[3:] for row in incremental] == [(2, 2, 0, 15.0)]
+
+    db_ops.rebuild_rollups()
+    assert rollups(db_ops, DailyCallRollup, CALL_ROLLUP_COLUMNS) == incremental
+
+
+def test_chat_repeated_within_a_batch_is_rolled_up_once(db_ops):
+    result = db_ops.store_chat_records(chat_frame(['1', '1', '2']))
+
+    assert result == {'inserted': 2, 'skipped': 1}
+    incremental = rollups(db_ops, DailyChatRollup, CHAT_ROLLUP_COLUMNS)
+    assert [row[3] for row in incremental] == [2]
+
+    db_ops.rebuild_rollups()
+    assert rollups(db_ops, DailyChatRollup, CHAT_ROLLUP_COLUMNS) == incremental
@@ -0,0 +1,14 @@
+import pandas as pd
+
+from components.visualizations import Visualizations
+
+
+def test_bin_response_times_skips_infinite_and_missing_values():
+    bins = Visualizations.bin_response_times(pd.Series(['inf', '-inf', None, 'x', 5, 40]))
+
+    assert bins['bin_start'].tolist() == [0.0, 30.0]
+    assert bins['count'].tolist() == [1, 1]
+
+
+def test_bin_response_times_of_only_infinite_values_is_empty():
+    assert Visualizations.bin_response_times(pd.Series(['inf'])).empty
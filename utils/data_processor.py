@@ -1,16 +1,20 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from .phone_utils import standardize_phone_number
+from .phone_utils import standardize_phone_series
+from .instrumentation import instrumented, span
+from .schema import apply_dtypes, CALL_DTYPES, CHAT_DTYPES, TEXT_DTYPE
 
 class DataProcessor:
     @staticmethod
-    def process_call_data(df, existing_leads_df=None):
+    @instrumented()
+    def process_call_data(df, existing_leads_df=None, lead_index=None):
         df = df.copy()
 
         # Clean phone numbers and remove angle brackets
-        df['Call From'] = df['Call From'].apply(lambda x: standardize_phone_number(str(x)))
-        df['Call To'] = df['Call To'].apply(lambda x: standardize_phone_number(str(x)))
+        with span('standardize_phones', rows=len(df)):
+            df['Call From'] = standardize_phone_series(df['Call From'])
+            df['Call To'] = standardize_phone_series(df['Call To'])
 
         # Convert durations to numeric, handling any non-numeric values
         for col in ['Call Duration', 'Ring Duration', 'Talk Duration']:
@@ -18,7 +22,10 @@ class DataProcessor:
 
         # Initialize new columns
         try:
-            df['lead_date'] = pd.to_datetime(df['Time']).dt.date
+            df['Time'] = pd.to_datetime(df['Time'])
+
+            # Dates stay datetime64 (midnight) rather than Python date objects
+            df['lead_date'] = df['Time'].dt.normalize()
             df['call_date'] = df['lead_date']  # Use the same date for both
         except Exception as e:
             print(f"Error processing dates: {str(e)}")
@@ -29,34 +36,54 @@ class DataProcessor:
         df['source'] = None
 
         # Determine if fresh lead
-        if existing_leads_df is not None and not existing_leads_df.empty:
-            try:
-                existing_leads_df['lead_date'] = pd.to_datetime(existing_leads_df['Created on']).dt.date
-                existing_leads_df['phone_number'] = existing_leads_df['Client'].apply(
-                    lambda x: standardize_phone_number(str(x)))
-
-                for idx, row in df.iterrows():
-                    call_number = row['Call To']
-                    call_date = row['lead_date']
-
-                    # Check if number exists in leads and if call was made on the same day
-                    matching_lead = existing_leads_df[
-                        (existing_leads_df['phone_number'] == call_number) & 
-                        (existing_leads_df['lead_date'] == call_date)
-                    ]
-
-                    if not matching_lead.empty:
-                        df.at[idx, 'is_fresh_lead'] = True
-                        df.at[idx, 'source'] = matching_lead.iloc[0]['Channel']
-            except Exception as e:
-                print(f"Error processing lead matching: {str(e)}")
+        try:
+            if lead_index is None and existing_leads_df is not None and not existing_leads_df.empty:
+                lead_index = DataProcessor.build_lead_index(existing_leads_df)
+
+            if lead_index is not None and not lead_index.empty:
+                # Resolve every call against the (phone_number, lead_date) index in one merge
+                with span('fresh_lead_matching', rows=len(df)):
+                    matches = df[['Call To', 'lead_date']].merge(
+                        lead_index,
+                        how='left',
+                        left_on=['Call To', 'lead_date'],
+                        right_on=['phone_number', 'lead_date'],
+                        indicator=True
+                    )
+                    is_match = (matches['_merge'] == 'both').to_numpy()
+
+                    df['is_fresh_lead'] = is_match
+                    df['source'] = matches['source'].where(is_match, None).to_numpy()
+        except Exception as e:
+            print(f"Error processing lead matching: {str(e)}")
 
         # Clean any tabs or whitespace from ID field
         df['ID'] = df['ID'].astype(str).str.strip()
 
-        return df
+        return apply_dtypes(df, CALL_DTYPES)
+
+    @staticmethod
+    @instrumented()
+    def build_lead_index(leads_df):
+        """Index chat leads by (phone_number, lead_date), keeping the first chat's Channel"""
+        lead_index = pd.DataFrame({
+            'phone_number': standardize_phone_series(leads_df['Client']).astype(TEXT_DTYPE),
+            'lead_date': pd.to_datetime(leads_df['Created on']).dt.normalize(),
+            'source': leads_df['Channel']
+        })
+
+        # Leads without a usable date can never match a call
+        lead_index = lead_index.dropna(subset=['lead_date'])
+        return lead_index.drop_duplicates(subset=['phone_number', 'lead_date'], keep='first')
+
+    @staticmethod
+    def merge_lead_indexes(lead_indexes):
+        """Combine lead indexes built from consecutive chunks, keeping the earliest chat per key"""
+        lead_index = pd.concat(lead_indexes, ignore_index=True)
+        return lead_index.drop_duplicates(subset=['phone_number', 'lead_date'], keep='first')
 
     @staticmethod
+    @instrumented()
     def process_chat_data(df):
         df = df.copy()
 
@@ -71,7 +98,7 @@ class DataProcessor:
 
         # Add lead date with error handling
         try:
-            df['lead_date'] = df['Created on'].dt.date
+            df['lead_date'] = df['Created on'].dt.normalize()
         except Exception as e:
             print(f"Error setting lead_date: {str(e)}")
             df['lead_date'] = None
@@ -79,7 +106,8 @@ class DataProcessor:
         df['is_fresh_lead'] = False  # Initialize the column
 
         # Clean and standardize phone numbers from client field
-        df['phone_number'] = df['Client'].apply(lambda x: standardize_phone_number(str(x)))
+        with span('standardize_phones', rows=len(df)):
+            df['phone_number'] = standardize_phone_series(df['Client'])
 
         # Convert numeric columns
         numeric_columns = ['Messages', 'Waiting for agent to respond', 'Conversation duration',
@@ -92,4 +120,4 @@ class DataProcessor:
         # Clean chat ID
         df['#'] = df['#'].astype(str).str.strip()
 
-        return df
\ No newline at end of file
+        return apply_dtypes(df, CHAT_DTYPES)
\ No newline at end of file
@@ -0,0 +1,23 @@
+import hashlib
+import os
+
+# Bytes read per step while hashing an upload
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_digest(file):
+    """SHA-256 of a file path or file object, leaving a file object's read position unchanged"""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as handle:
+            return file_digest(handle)
+
+    digest = hashlib.sha256()
+    position = file.tell()
+    file.seek(0)
+    while True:
+        block = file.read(HASH_BLOCK_SIZE)
+        if not block:
+            break
+        digest.update(block.encode() if isinstance(block, str) else block)
+    file.seek(position)
+    return digest.hexdigest()
@@ -0,0 +1,142 @@
+import functools
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# PERF_LOG=1 also writes every span as a JSON line to stderr
+if os.environ.get('PERF_LOG', '').strip().lower() in ('1', 'true', 'yes', 'on'):
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+# PERF_TRACE_MEMORY=1 measures each span's peak with tracemalloc, which is exact but
+# slows allocation-heavy code; otherwise the growth of the process's peak RSS is used
+if os.environ.get('PERF_TRACE_MEMORY', '').strip().lower() in ('1', 'true', 'yes', 'on'):
+    tracemalloc.start()
+
+# Spans finished in the current script run or thread, and the spans still open around it
+_recorded = ContextVar('recorded_spans', default=None)
+_open_spans = ContextVar('open_spans', default=())
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes, where the platform reports it"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Linux reports KiB
+
+
+class Span:
+    """Wall time, rows and peak memory growth of one instrumented stage"""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.depth = len(_open_spans.get())
+        self._peak = 0
+
+    def start(self):
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            for parent in _open_spans.get():
+                parent._peak = max(parent._peak, peak)  # Keep the enclosing spans' peaks across the reset
+            tracemalloc.reset_peak()
+            self._start_memory = current
+        else:
+            self._start_memory = _peak_rss()
+        self._start_time = time.perf_counter()
+
+    def finish(self):
+        seconds = time.perf_counter() - self._start_time
+        if tracemalloc.is_tracing():
+            peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            for parent in _open_spans.get():
+                parent._peak = max(parent._peak, peak)
+            memory = peak - self._start_memory
+        else:
+            end = _peak_rss()
+            memory = end - self._start_memory if end is not None else None
+
+        return {
+            'name': self.name,
+            'depth': self.depth,
+            'seconds': seconds,
+            'rows': self.rows,
+            'rows_per_second': self.rows / seconds if self.rows and seconds > 0 else None,
+            'memory_delta_mb': memory / 1e6 if memory is not None else None
+        }
+
+
+@contextmanager
+def span(name, rows=None):
+    """Time a stage; set .rows on the yielded span when the row count is only known inside"""
+    current = Span(name, rows)
+    recorded = _recorded.get()
+    if recorded is None and not logger.isEnabledFor(logging.INFO):
+        yield current
+        return
+
+    # Reserve the slot now so spans are listed in the order they started, parents first
+    if recorded is not None:
+        slot = len(recorded)
+        recorded.append(None)
+
+    current.start()
+    token = _open_spans.set(_open_spans.get() + (current,))
+    try:
+        yield current
+    finally:
+        _open_spans.reset(token)
+        record = current.finish()
+        if recorded is not None:
+            recorded[slot] = record
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record))
+
+
+def _row_count(args, result):
+    """Rows of the first frame passed in, or of the frame returned"""
+    for value in args:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return len(value)
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    return None
+
+
+def instrumented(name=None):
+    """Decorator running a function inside a span named after it"""
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name) as current:
+                result = func(*args, **kwargs)
+                current.rows = _row_count(args, result)
+                return result
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def record_spans():
+    """Collect the spans run in this context, in the order they started"""
+    recorded = []
+    token = _recorded.set(recorded)
+    try:
+        yield recorded
+    finally:
+        _recorded.reset(token)
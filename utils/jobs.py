@@ -0,0 +1,137 @@
+import io
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from .pipeline import DEFAULT_CHUNK_SIZE, ingest_file_chunks, new_ingest_summary
+
+# Jobs run one at a time by default so a queued upload never competes with a running one for the database
+DEFAULT_JOB_WORKERS = 1
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Runners mark their jobs alive this often; jobs not marked for JOB_STALE_SECONDS belong to a stopped runner
+JOB_HEARTBEAT_SECONDS = 10
+JOB_STALE_SECONDS = 60
+
+
+def count_rows(data):
+    """Approximate data rows in the bytes of a CSV upload, for progress and ETA"""
+    lines = data.count(b'\n') + (0 if not data or data.endswith(b'\n') else 1)
+    return max(lines - 1, 0)  # Header
+
+
+def _named_file(name, data):
+    """In-memory file for an upload that keeps its name for the ingestion ledger"""
+    file = io.BytesIO(data)
+    file.name = name
+    return file
+
+
+def _summary_values(summary):
+    return {
+        'processed_rows': sum(summary[kind][count] for kind in ('calls', 'chats') for count in ('inserted', 'skipped')),
+        'calls_inserted': summary['calls']['inserted'],
+        'calls_skipped': summary['calls']['skipped'],
+        'chats_inserted': summary['chats']['inserted'],
+        'chats_skipped': summary['chats']['skipped'],
+        'first_date': summary['first_date'],
+        'last_date': summary['last_date']
+    }
+
+
+def job_progress(job, now=None):
+    """Fraction done, rows/sec and ETA in seconds for a job row returned by DatabaseOperations.get_jobs"""
+    fraction = min(job['processed_rows'] / job['total_rows'], 1.0) if job['total_rows'] else 0.0
+    if job['status'] == 'completed':
+        fraction = 1.0
+
+    rate = eta = None
+    if job['started_at'] is not None:
+        elapsed = ((job['finished_at'] or now or datetime.utcnow()) - job['started_at']).total_seconds()
+        if elapsed > 0 and job['processed_rows']:
+            rate = job['processed_rows'] / elapsed
+            if job['status'] == 'running':
+                eta = max(job['total_rows'] - job['processed_rows'], 0) / rate
+    return {'fraction': fraction, 'rows_per_second': rate, 'eta_seconds': eta}
+
+
+class JobRunner:
+    """Runs uploads through the chunked ingest pipeline on background threads.
+
+    Each job's status, row counts and any error are kept in the ingest_jobs
+    table so the dashboard can poll them from any session. Cancelling stops a
+    job between chunks; the chunks already stored stay, and re-uploading the
+    files skips them.
+
+    Several dashboard processes can share the table. Each runner owns the jobs
+    it queued and marks them alive on a heartbeat thread, which also fails the
+    jobs of runners that stopped marking theirs.
+    """
+
+    def __init__(self, db_ops, workers=DEFAULT_JOB_WORKERS, chunksize=DEFAULT_CHUNK_SIZE):
+        self.db_ops = db_ops
+        self.chunksize = chunksize
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest-job')
+
+        self._heartbeat = threading.Thread(target=self._beat, name='ingest-job-heartbeat', daemon=True)
+        self._heartbeat.start()
+
+    def _beat(self):
+        # Uploads are held in memory, so jobs of a stopped runner cannot be resumed
+        while True:
+            try:
+                self.db_ops.touch_jobs(self.owner)
+                self.db_ops.fail_interrupted_jobs(datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS))
+            except SQLAlchemyError as e:
+                print(f"Error updating job heartbeat: {str(e)}")
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+
+    def submit(self, call_files, chat_files):
+        """Queue the (name, bytes) call and chat files as one job and return its id"""
+        job_id = self.db_ops.create_job(
+            ', '.join(name for name, _ in call_files + chat_files),
+            sum(count_rows(data) for _, data in call_files + chat_files),
+            owner=self.owner
+        )
+        self.executor.submit(self._run, job_id, call_files, chat_files)
+        return job_id
+
+    def cancel(self, job_id):
+        self.db_ops.update_job(job_id, cancel_requested=True)
+
+    def _finish(self, job_id, status, summary, error=None):
+        self.db_ops.update_job(
+            job_id, status=status, error=error, finished_at=datetime.utcnow(), **_summary_values(summary)
+        )
+
+    def _run(self, job_id, call_files, chat_files):
+        summary = new_ingest_summary()
+        if self.db_ops.update_job(job_id, status='running', started_at=datetime.utcnow()):
+            self._finish(job_id, 'cancelled', summary)
+            return
+
+        try:
+            chunks = ingest_file_chunks(
+                [_named_file(name, data) for name, data in call_files],
+                [_named_file(name, data) for name, data in chat_files],
+                self.db_ops, summary, self.chunksize
+            )
+            for _ in chunks:
+                if self.db_ops.update_job(job_id, **_summary_values(summary)):
+                    chunks.close()
+                    self._finish(job_id, 'cancelled', summary)
+                    return
+        except Exception as e:
+            self._finish(job_id, 'failed', summary, error=str(e))
+            return
+
+        self._finish(job_id, 'completed', summary)
+
@@ -0,0 +1,59 @@
+import pandas as pd
+
+from .instrumentation import instrumented
+
+
+class LeadMetrics:
+    """Lead, contact and conversion counts computed once per pair of processed frames.
+
+    Exposes the funnel_counts, conversion_by_source and key_metrics parts of
+    the dashboard aggregates interface, so the funnel, the conversion chart
+    and the metric cards all read the same sets instead of each rescanning
+    the frames.
+    """
+
+    # Processed columns the metrics read
+    CALL_COLUMNS = ['Call To', 'Status', 'is_fresh_lead']
+    CHAT_COLUMNS = ['Channel', 'phone_number', 'Total response time']
+
+    @instrumented()
+    def __init__(self, processed_calls, processed_chats):
+        call_to = processed_calls['Call To']
+        answered = call_to[processed_calls['Status'] == 'ANSWERED']
+        answered_phones = answered.dropna().unique()
+
+        self.total_leads = processed_chats['phone_number'].nunique(dropna=False)
+        self.contacted_leads = call_to.nunique(dropna=False)
+        self.answered_calls = answered.nunique(dropna=False)
+        self.fresh_leads = call_to[processed_calls['is_fresh_lead']].nunique(dropna=False)
+        self.avg_response_time = processed_chats['Total response time'].mean()
+
+        # One hash join of each channel's distinct lead numbers against the answered numbers
+        channel_leads = processed_chats[['Channel', 'phone_number']].drop_duplicates()
+        channel_leads = channel_leads.assign(converted=channel_leads['phone_number'].isin(answered_phones))
+        self.channel_conversions = (
+            channel_leads.groupby('Channel', observed=True, sort=False)
+            .agg(leads=('phone_number', 'size'), converted=('converted', 'sum'))
+        )
+
+    def funnel_counts(self):
+        return {
+            'total_leads': self.total_leads,
+            'contacted_leads': self.contacted_leads,
+            'answered_calls': self.answered_calls
+        }
+
+    def conversion_by_source(self):
+        conversions = self.channel_conversions
+        return pd.DataFrame({
+            'source': conversions.index.astype(object),
+            'conversion_rate': (conversions['converted'] / conversions['leads'] * 100).to_numpy()
+        })
+
+    def key_metrics(self):
+        return {
+            'total_leads': self.total_leads,
+            'fresh_leads': self.fresh_leads,
+            'avg_response_time': self.avg_response_time,
+            'conversion_rate': (self.fresh_leads / self.total_leads * 100) if self.total_leads > 0 else 0
+        }
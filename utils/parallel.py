@@ -0,0 +1,129 @@
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError
+
+from .data_processor import DataProcessor
+from .hashing import file_digest
+from .pipeline import (
+    LedgerEntry, add_counts, clean_keys, extend_dates, new_ingest_summary, read_csv_chunks
+)
+
+# Processes used to parse and process files; DB writer threads each hold their own pooled connection
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_WRITERS = 4
+
+# Databases that lock the whole file on write, where extra writer threads only wait on each other.
+# Dialects without ON CONFLICT (db_ops.upsert_insert is None) also get one writer: their rollup
+# update-then-insert is not atomic, so two writers adding the same new rollup key would conflict
+SINGLE_WRITER_DIALECTS = {'sqlite'}
+
+# Concurrent writers can deadlock on shared rollup rows; the losing transaction is retried
+STORE_ATTEMPTS = 3
+
+
+def _open(source):
+    """File object for a path or for the raw bytes of an upload"""
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _process_chat_file(name, source, digest, store):
+    """Worker: parse one chat export, returning its lead index and, if it is to be stored, its processed rows"""
+    df = next(read_csv_chunks(_open(source)))
+    lead_index = DataProcessor.build_lead_index(df)
+    if not store:
+        return lead_index, None, None
+
+    entry = LedgerEntry(None, 'chat', digest=digest, file_name=name)
+    entry.add_chunk(df, clean_keys(df, 'chat'))
+    return lead_index, DataProcessor.process_chat_data(df), entry
+
+
+def _process_call_file(name, source, digest, lead_index):
+    """Worker: parse and process one call export against the merged lead index"""
+    df = next(read_csv_chunks(_open(source)))
+    entry = LedgerEntry(None, 'call', digest=digest, file_name=name)
+    entry.add_chunk(df, clean_keys(df, 'call'))
+    return DataProcessor.process_call_data(df, lead_index=lead_index), entry
+
+
+def parallel_ingest(call_files, chat_files, db_ops, workers=DEFAULT_WORKERS, writers=DEFAULT_WRITERS):
+    """Process many call and chat exports across a process pool and store them with parallel writers.
+
+    call_files and chat_files are lists of (name, source) pairs, where source is
+    a path or the bytes of an upload. Files already in the ingestion ledger are
+    not stored again, and every chat file feeds one shared lead index before any
+    call file is tagged. Returns the same summary as ingest_uploads.
+    """
+    summary = new_ingest_summary()
+    summary_lock = threading.Lock()
+
+    def store(kind, store_records, processed, entry):
+        for attempt in range(STORE_ATTEMPTS):
+            try:
+                result = store_records(processed)
+                break
+            except OperationalError:
+                if attempt == STORE_ATTEMPTS - 1:
+                    raise
+        entry.record(db_ops)
+        with summary_lock:
+            add_counts(summary[kind], result)
+            extend_dates(summary, entry.first_date, entry.last_date)
+
+    def check_ledger(files, kind):
+        """Digest each file and count those already in the ledger as skipped"""
+        checked = []
+        for name, source in files:
+            digest = file_digest(_open(source))
+            entry = db_ops.get_ingested_file(digest)
+            if entry is not None:
+                summary[kind]['skipped'] += entry['row_count']
+                summary['ledger_skipped'] += entry['row_count']
+                extend_dates(summary, entry['first_date'], entry['last_date'])
+            checked.append((name, source, digest, entry is None))
+        return checked
+
+    calls = check_ledger(call_files, 'calls')
+    chats = check_ledger(chat_files, 'chats')
+    new_calls = [(name, source, digest) for name, source, digest, is_new in calls if is_new]
+    if not new_calls and not any(is_new for *_, is_new in chats):
+        summary['already_ingested'] = True
+        return summary
+
+    if db_ops.dialect in SINGLE_WRITER_DIALECTS or db_ops.upsert_insert is None:
+        writers = 1
+
+    with ProcessPoolExecutor(max_workers=workers) as processes, ThreadPoolExecutor(max_workers=writers) as threads:
+        writes = []
+
+        # Chat files already stored are still read when new calls need their leads
+        chat_jobs = [
+            processes.submit(_process_chat_file, name, source, digest, is_new)
+            for name, source, digest, is_new in chats
+            if is_new or new_calls
+        ]
+
+        lead_indexes = []
+        for job in chat_jobs:
+            lead_index, processed, entry = job.result()
+            lead_indexes.append(lead_index)
+            if processed is not None:
+                writes.append(threads.submit(store, 'chats', db_ops.store_chat_records, processed, entry))
+
+        lead_index = DataProcessor.merge_lead_indexes(lead_indexes) if lead_indexes else None
+
+        call_jobs = [
+            processes.submit(_process_call_file, name, source, digest, lead_index)
+            for name, source, digest in new_calls
+        ]
+        for job in call_jobs:
+            processed, entry = job.result()
+            writes.append(threads.submit(store, 'calls', db_ops.store_call_records, processed, entry))
+
+        for write in writes:
+            write.result()
+
+    return summary
@@ -1,4 +1,9 @@
 import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
 
 def standardize_phone_number(phone):
     """Standardize phone numbers to a consistent format"""
@@ -18,3 +23,49 @@ def standardize_phone_number(phone):
         return '2' + phone
     
     return phone
+
+
+# Upper bound on raw -> standardized values kept between uploads
+PHONE_CACHE_SIZE = 500000
+
+_phone_cache = OrderedDict()
+_phone_cache_lock = threading.Lock()
+
+
+def _standardize_strings(phones):
+    """Vectorized standardize_phone_number over a Series of strings"""
+    phones = phones.str.replace(r'<[^>]+>', '', regex=True)
+    phones = phones.str.replace(r'\D', '', regex=True)
+
+    # Egyptian local numbers (01...) get the country code
+    is_local = (phones.str.len() == 11) & phones.str.startswith('01')
+    return phones.where(~is_local, '2' + phones)
+
+
+def standardize_phone_series(series):
+    """Standardize a Series of phone numbers, same result as standardize_phone_number(str(x)) per value"""
+    # Phone numbers repeat heavily, so only the distinct values are normalized
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    raw = [str(value) for value in uniques]
+
+    with _phone_cache_lock:
+        normalized = [_phone_cache.get(value) for value in raw]
+        for value, phone in zip(raw, normalized):
+            if phone is not None:
+                _phone_cache.move_to_end(value)
+
+    missing = [value for value, phone in zip(raw, normalized) if phone is None]
+    if missing:
+        computed = dict(zip(missing, _standardize_strings(pd.Series(missing, dtype=object))))
+        normalized = [computed[value] if phone is None else phone for value, phone in zip(raw, normalized)]
+
+        with _phone_cache_lock:
+            _phone_cache.update(computed)
+            while len(_phone_cache) > PHONE_CACHE_SIZE:
+                _phone_cache.popitem(last=False)
+
+    return pd.Series(
+        np.asarray(normalized, dtype=object)[codes],
+        index=series.index,
+        name=series.name
+    )
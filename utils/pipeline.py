@@ -0,0 +1,300 @@
+import pandas as pd
+from .data_processor import DataProcessor
+from .hashing import file_digest
+from .instrumentation import span
+from .schema import AGENT_COLUMNS, READ_DTYPES, RESPONSE_TIME_BIN_WIDTH
+
+# Rows read from an uploaded CSV per chunk in streaming mode
+DEFAULT_CHUNK_SIZE = 50000
+
+# Raw columns holding each file type's record key and record date
+RECORD_KEY_COLUMNS = {'call': 'ID', 'chat': '#'}
+RECORD_DATE_COLUMNS = {'call': 'Time', 'chat': 'Created on'}
+
+
+def read_csv_chunks(file, chunksize=None):
+    """Yield an uploaded CSV as frames of at most chunksize rows, or as one frame when chunksize is None"""
+    if hasattr(file, 'seek'):
+        file.seek(0)
+
+    if chunksize is None:
+        with span('read_csv') as current:
+            df = pd.read_csv(file, dtype=READ_DTYPES)
+            current.rows = len(df)
+        yield df
+        return
+
+    chunks = iter(pd.read_csv(file, chunksize=chunksize, dtype=READ_DTYPES))
+    while True:
+        with span('read_csv') as current:
+            chunk = next(chunks, None)
+            current.rows = len(chunk) if chunk is not None else 0
+        if chunk is None:
+            return
+        yield chunk
+
+
+def detect_file_type(file):
+    """'call' or 'chat' from an export's header row, or None when it is neither"""
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    columns = pd.read_csv(file, nrows=0).columns
+    if 'Call From' in columns:
+        return 'call'
+    if 'Channel' in columns:
+        return 'chat'
+    return None
+
+
+def clean_keys(df, file_type):
+    """Record keys of a raw call or chat frame, cleaned the way DataProcessor cleans them"""
+    return df[RECORD_KEY_COLUMNS[file_type]].astype(str).str.strip()
+
+
+class LedgerEntry:
+    """What the ingestion ledger records about one uploaded file"""
+
+    def __init__(self, file, file_type, digest=None, file_name=None):
+        self.digest = digest or file_digest(file)
+        self.file_type = file_type
+        self.file_name = file_name or getattr(file, 'name', None) or str(file)
+        self.chunks = []
+        self.first_date = None
+        self.last_date = None
+
+    def add_chunk(self, df, keys):
+        self.chunks.append({
+            'row_count': len(keys),
+            'min_key': keys.min() if len(keys) else None,
+            'max_key': keys.max() if len(keys) else None
+        })
+
+        dates = pd.to_datetime(df[RECORD_DATE_COLUMNS[self.file_type]], errors='coerce').dropna()
+        if not dates.empty:
+            first_date, last_date = dates.min().date(), dates.max().date()
+            self.first_date = first_date if self.first_date is None else min(self.first_date, first_date)
+            self.last_date = last_date if self.last_date is None else max(self.last_date, last_date)
+
+    def record(self, db_ops):
+        db_ops.record_ingested_file(
+            self.digest, self.file_type, self.file_name, self.chunks, self.first_date, self.last_date
+        )
+
+
+def add_counts(totals, result):
+    for key, value in result.items():
+        totals[key] += value
+
+
+def extend_dates(summary, first_date, last_date):
+    if first_date is not None:
+        summary['first_date'] = first_date if summary['first_date'] is None else min(summary['first_date'], first_date)
+    if last_date is not None:
+        summary['last_date'] = last_date if summary['last_date'] is None else max(summary['last_date'], last_date)
+
+
+def new_ingest_summary():
+    return {
+        'calls': {'inserted': 0, 'skipped': 0},
+        'chats': {'inserted': 0, 'skipped': 0},
+        'already_ingested': False,
+        # Rows of files found in the ledger, counted as skipped without being read
+        'ledger_skipped': 0,
+        'first_date': None,
+        'last_date': None
+    }
+
+
+def ingest_chunks(call_file, chat_file, db_ops, summary, chunksize=None):
+    """Process and store both uploads, yielding ('chat' | 'call', processed_chunk) as each chunk is stored.
+
+    Files already in the ingestion ledger are not processed again, and rows
+    whose keys are already stored are dropped before processing. summary is
+    updated with the inserted/skipped counts and the date range covered.
+    """
+    yield from ingest_file_chunks([call_file], [chat_file], db_ops, summary, chunksize)
+
+
+def ingest_file_chunks(call_files, chat_files, db_ops, summary, chunksize=None):
+    """Like ingest_chunks for any number of call and chat files, tagging every call against all of the chats"""
+    call_entries = [LedgerEntry(file, 'call') for file in call_files]
+    chat_entries = [LedgerEntry(file, 'chat') for file in chat_files]
+    known = {}
+    for entry in call_entries + chat_entries:
+        known[entry.digest] = db_ops.get_ingested_file(entry.digest)
+        if known[entry.digest] is not None:
+            # Every row of a file in the ledger is already stored
+            summary[entry.file_type + 's']['skipped'] += known[entry.digest]['row_count']
+            summary['ledger_skipped'] += known[entry.digest]['row_count']
+            extend_dates(summary, known[entry.digest]['first_date'], known[entry.digest]['last_date'])
+
+    new_calls = [(file, entry) for file, entry in zip(call_files, call_entries) if known[entry.digest] is None]
+    new_chats = [entry for entry in chat_entries if known[entry.digest] is None]
+    if not new_calls and not new_chats:
+        summary['already_ingested'] = True
+        return
+
+    # Chats go first: every call chunk needs the complete lead index.
+    # A chat file that was already ingested is still read for that index.
+    lead_indexes = []
+    for chat_file, chat_entry in zip(chat_files, chat_entries):
+        is_known = known[chat_entry.digest] is not None
+        if is_known and not new_calls:
+            continue
+
+        for chunk in read_csv_chunks(chat_file, chunksize):
+            lead_indexes.append(DataProcessor.build_lead_index(chunk))
+            if is_known:
+                continue
+
+            keys = clean_keys(chunk, 'chat')
+            new_chunk = chunk[~keys.isin(db_ops.existing_keys('chat', keys))]
+            summary['chats']['skipped'] += len(chunk) - len(new_chunk)
+            chat_entry.add_chunk(chunk, keys)
+
+            if not new_chunk.empty:
+                processed = DataProcessor.process_chat_data(new_chunk)
+                add_counts(summary['chats'], db_ops.store_chat_records(processed))
+                yield 'chat', processed
+
+        if not is_known:
+            chat_entry.record(db_ops)
+            extend_dates(summary, chat_entry.first_date, chat_entry.last_date)
+
+    lead_index = DataProcessor.merge_lead_indexes(lead_indexes) if lead_indexes else None
+
+    for call_file, call_entry in new_calls:
+        for chunk in read_csv_chunks(call_file, chunksize):
+            keys = clean_keys(chunk, 'call')
+            new_chunk = chunk[~keys.isin(db_ops.existing_keys('call', keys))]
+            summary['calls']['skipped'] += len(chunk) - len(new_chunk)
+            call_entry.add_chunk(chunk, keys)
+
+            if not new_chunk.empty:
+                processed = DataProcessor.process_call_data(new_chunk, lead_index=lead_index)
+                add_counts(summary['calls'], db_ops.store_call_records(processed))
+                yield 'call', processed
+
+        call_entry.record(db_ops)
+        extend_dates(summary, call_entry.first_date, call_entry.last_date)
+
+
+def ingest_uploads(call_file, chat_file, db_ops):
+    """Process and store both uploads in memory, returning the newly processed frames and a summary"""
+    summary = new_ingest_summary()
+    processed = {'call': [], 'chat': []}
+    for file_type, chunk in ingest_chunks(call_file, chat_file, db_ops, summary):
+        processed[file_type].append(chunk)
+
+    processed_calls = pd.concat(processed['call']) if processed['call'] else None
+    processed_chats = pd.concat(processed['chat']) if processed['chat'] else None
+    return processed_calls, processed_chats, summary
+
+
+def stream_ingest(call_file, chat_file, db_ops, chunksize=DEFAULT_CHUNK_SIZE):
+    """Process and store both uploads chunk by chunk, returning dashboard aggregates and a summary"""
+    summary = new_ingest_summary()
+    aggregates = StreamingAggregates()
+    for file_type, chunk in ingest_chunks(call_file, chat_file, db_ops, summary, chunksize):
+        if file_type == 'chat':
+            aggregates.add_chats(chunk)
+        else:
+            aggregates.add_calls(chunk)
+    return aggregates, summary
+
+
+class StreamingAggregates:
+    """Running dashboard aggregates that are updated chunk by chunk instead of holding full frames"""
+
+    def __init__(self):
+        self._fresh_leads = pd.DataFrame({
+            'lead_date': pd.Series(dtype='datetime64[ns]'),
+            'source': pd.Series(dtype='object'),
+            'count': pd.Series(dtype='int64')
+        })
+        self._channel_counts = pd.Series(dtype='int64')
+        self._agent_sums = pd.DataFrame(columns=AGENT_COLUMNS, dtype='float64')
+        self._agent_counts = pd.DataFrame(columns=AGENT_COLUMNS, dtype='float64')
+        self._response_time_bins = pd.Series(dtype='int64')
+        self._response_time_sum = 0.0
+        self._response_time_count = 0
+
+        # Distinct phone sets are needed for the funnel and conversion figures
+        self._lead_phones = set()
+        self._channel_phones = {}
+        self._contacted_phones = set()
+        self._answered_phones = set()
+        self._fresh_phones = set()
+
+    def add_chats(self, chunk):
+        self._channel_counts = self._channel_counts.add(chunk['Channel'].value_counts(), fill_value=0)
+
+        agents = chunk.groupby('Employee', observed=True)[AGENT_COLUMNS]
+        self._agent_sums = self._agent_sums.add(agents.sum(), fill_value=0)
+        self._agent_counts = self._agent_counts.add(agents.count(), fill_value=0)
+
+        response_times = chunk['Total response time'].dropna()
+        self._response_time_sum += response_times.sum()
+        self._response_time_count += len(response_times)
+        bins = (response_times // RESPONSE_TIME_BIN_WIDTH * RESPONSE_TIME_BIN_WIDTH).value_counts()
+        self._response_time_bins = self._response_time_bins.add(bins, fill_value=0)
+
+        self._lead_phones.update(chunk['phone_number'].unique())
+        for channel, phones in chunk.groupby('Channel', observed=True)['phone_number']:
+            self._channel_phones.setdefault(channel, set()).update(phones.unique())
+
+    def add_calls(self, chunk):
+        fresh = chunk[chunk['is_fresh_lead']]
+        fresh_counts = fresh.groupby(['lead_date', 'source'], observed=True).size().reset_index(name='count')
+        if not self._fresh_leads.empty:
+            fresh_counts = pd.concat([self._fresh_leads, fresh_counts], ignore_index=True)
+        self._fresh_leads = (
+            fresh_counts.groupby(['lead_date', 'source'], as_index=False, observed=True)['count'].sum()
+        )
+
+        self._contacted_phones.update(chunk['Call To'].unique())
+        self._answered_phones.update(chunk.loc[chunk['Status'] == 'ANSWERED', 'Call To'].unique())
+        self._fresh_phones.update(fresh['Call To'].unique())
+
+    def fresh_leads_by_date(self):
+        return self._fresh_leads
+
+    def channel_counts(self):
+        channel_counts = self._channel_counts.astype('int64')
+        return channel_counts[channel_counts > 0].sort_values(ascending=False)
+
+    def funnel_counts(self):
+        return {
+            'total_leads': len(self._lead_phones),
+            'contacted_leads': len(self._contacted_phones),
+            'answered_calls': len(self._answered_phones)
+        }
+
+    def conversion_by_source(self):
+        conversion_data = []
+        for source, phones in self._channel_phones.items():
+            converted = len(phones & self._answered_phones)
+            conversion_data.append({
+                'source': source,
+                'conversion_rate': converted / len(phones) * 100 if phones else 0
+            })
+        return pd.DataFrame(conversion_data, columns=['source', 'conversion_rate'])
+
+    def agent_performance(self):
+        return (self._agent_sums / self._agent_counts).round(2)
+
+    def response_time_bins(self):
+        bins = self._response_time_bins.sort_index().astype('int64')
+        return pd.DataFrame({'bin_start': bins.index, 'count': bins.values})
+
+    def key_metrics(self):
+        total_leads = len(self._lead_phones)
+        fresh_leads = len(self._fresh_phones)
+        return {
+            'total_leads': total_leads,
+            'fresh_leads': fresh_leads,
+            'avg_response_time': (
+                self._response_time_sum / self._response_time_count if self._response_time_count else float('nan')
+            ),
+            'conversion_rate': fresh_leads / total_leads * 100 if total_leads > 0 else 0
+        }
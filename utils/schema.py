@@ -0,0 +1,64 @@
+# Phone numbers and record keys are compared and stored as text, and Arrow
+# strings hold them far more compactly than Python str objects
+TEXT_DTYPE = 'string[pyarrow]'
+
+# Dtypes used when reading the raw exports; columns a file doesn't have are ignored.
+# Phone and key columns are read as text so type inference can't turn them into floats.
+READ_DTYPES = {
+    'ID': str,
+    '#': str,
+    'Call From': str,
+    'Call To': str,
+    'Client': str,
+    'Recording File': str,
+    'Status': 'category',
+    'Source Trunk': 'category',
+    'Communication Type': 'category',
+    'Type': 'category',
+    'Channel': 'category',
+    'Employee': 'category',
+    'CRM record': 'category'
+}
+
+# Dtypes applied to the processed frames
+CALL_DTYPES = {
+    'ID': TEXT_DTYPE,
+    'Call From': TEXT_DTYPE,
+    'Call To': TEXT_DTYPE,
+    'Recording File': TEXT_DTYPE,
+    'source': 'category'
+}
+
+CHAT_DTYPES = {
+    '#': TEXT_DTYPE,
+    'Client': TEXT_DTYPE,
+    'phone_number': TEXT_DTYPE,
+    'Messages': 'Int32',
+    'Conversation duration': 'Int32',
+    'Initial response time': 'Int32',
+    'Average response time': 'Int32'
+}
+
+# Width in seconds of the response time histogram bins. SQL, streaming and NumPy binning
+# all use this grid, so their bins line up when they are merged or coarsened
+RESPONSE_TIME_BIN_WIDTH = 30
+
+# Chat columns averaged per employee for the agent performance figure
+AGENT_COLUMNS = ['Messages', 'Total response time', 'Conversation duration']
+
+
+def apply_dtypes(df, dtypes):
+    """Cast the columns of df listed in dtypes, keeping a column's type when its values don't fit"""
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        try:
+            df[column] = df[column].astype(dtype)
+        except (TypeError, ValueError):
+            pass
+    return df
+
+
+def memory_usage(df):
+    """Deep memory usage of a frame in bytes"""
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,75 @@
+import os
+import uuid
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .schema import TEXT_DTYPE
+
+# Processed uploads are staged here as Parquet, keyed by the content digests they came from
+DEFAULT_STAGING_DIR = os.environ.get('STAGING_CACHE_DIR', '.staging_cache')
+
+# Least recently used files are evicted once the directory grows past this size
+DEFAULT_STAGING_MAX_BYTES = int(os.environ.get('STAGING_CACHE_MAX_MB', 2048)) * 1024 * 1024
+
+
+def chat_key(chat_digest):
+    return f"chat-{chat_digest}"
+
+
+def call_key(call_digest, chat_digest):
+    """Processed calls depend on the chats they were tagged against as well as on the call file"""
+    return f"call-{call_digest}-{chat_digest}"
+
+
+class StagingCache:
+    """Processed call and chat frames stored as Parquet files in a size-bounded local directory"""
+
+    def __init__(self, directory=DEFAULT_STAGING_DIR, max_bytes=DEFAULT_STAGING_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key, columns=None):
+        """Read a staged frame memory-mapped, optionally only some columns; None when missing"""
+        path = self._path(key)
+        try:
+            table = pq.read_table(path, columns=columns, memory_map=True)
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            return None
+
+        # Text columns come back as the processors' Arrow-backed strings rather than Python ones
+        with pd.option_context('mode.string_storage', pd.api.types.pandas_dtype(TEXT_DTYPE).storage):
+            return table.to_pandas()
+
+    def put(self, key, df):
+        """Stage a processed frame, then evict the least recently used files over the size limit"""
+        path = self._path(key)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        df.to_parquet(temp_path, index=False)
+        os.replace(temp_path, path)  # Readers never see a partly written file
+        self.evict()
+
+    def evict(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.parquet'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size